@@ -1,6 +1,15 @@
-from flask import Flask, request, jsonify
-from utils.codetocommands import codetocommands
-from utils.visualprocessing import process_image
+from flask import Flask, Response, request, jsonify
+from utils.codetocommands import codetocommands, tokenstocommands, get_grammar, configure_pool, configure_depth, pool
+from utils.memprofile import PeakRSS
+from utils.staticassets import AssetStore
+from utils.device import format_command, command_duration, is_device_command, expand_arcs
+from utils.interpreter.profiler import Profiler
+from utils.plotter.overdraw import skip_overdraw
+from utils.plotter.paper import fit_to_paper, rect
+from utils.preview import PreviewRenderer
+from utils.plotter.svg import iter_svg
+from utils.plotter.travel import optimize_travel
+from utils import metrics
 import os
 import threading
 import time
@@ -12,18 +21,117 @@ from flask_cors import CORS
 dotenv.load_dotenv()
 
 platform = os.getenv("PLATFORM", "raspberrypi")
+stream_stable_frames = int(os.getenv("STREAM_STABLE_FRAMES", "3"))
+stream_max_frames = int(os.getenv("STREAM_MAX_FRAMES", "300"))
+stream_max_seconds = float(os.getenv("STREAM_MAX_SECONDS", "60"))
+max_upload_bytes = int(os.getenv("MAX_UPLOAD_BYTES", str(8 * 1024 * 1024)))
+max_image_dimension = int(os.getenv("MAX_IMAGE_DIMENSION", "4096"))
+warm_up_in_background = os.getenv("WARM_UP_IN_BACKGROUND", "false").lower() == "true"
+interpreter_pool_size = int(os.getenv("INTERPRETER_POOL_SIZE", "4"))
+logo_max_depth = int(os.getenv("LOGO_MAX_DEPTH", "1000"))
+device_arcs = os.getenv("DEVICE_ARCS", "false").lower() == "true"
+arc_chord_tolerance = float(os.getenv("ARC_CHORD_TOLERANCE", "0.5"))
+optimize_travel_enabled = os.getenv("OPTIMIZE_TRAVEL", "false").lower() == "true"
+paper_width = float(os.getenv("PAPER_WIDTH", "0"))
+paper_height = float(os.getenv("PAPER_HEIGHT", "0"))
+paper_fit = os.getenv("PAPER_FIT", "none").lower()
+preview_size = int(os.getenv("PREVIEW_SIZE", "512"))
+preview_workers = int(os.getenv("PREVIEW_WORKERS", "2"))
+preview_cache_size = int(os.getenv("PREVIEW_CACHE_SIZE", "64"))
+skip_overdraw_enabled = os.getenv("SKIP_OVERDRAW", "false").lower() == "true"
+overdraw_tolerance = float(os.getenv("OVERDRAW_TOLERANCE", "0.5"))
+
+configure_pool(interpreter_pool_size)
+configure_depth(logo_max_depth)
 
 app = Flask(__name__, static_folder='static', static_url_path='/')
 currentlyRunningProgram = False
 
 CORS(app)
 
+assets = AssetStore(app.static_folder)
+app.view_functions['static'] = assets.serve
+
+
+def warm_up():
+    """Load the lazily imported pieces ahead of their first request"""
+    started = time.perf_counter()
+    get_grammar()
+    pool.prefill()
+    assets.ensure_loaded()
+    import utils.visualprocessing
+    import utils.visualstream
+    print(f"Warm up complete in {time.perf_counter() - started:.2f}s")
+
+if warm_up_in_background:
+    threading.Thread(target=warm_up, daemon=True).start()
+
+
+
+def fit_commands(commands):
+    """Fit and clip a compiled history to the paper, if one is set"""
+    if paper_width > 0 and paper_height > 0:
+        return fit_to_paper(commands, paper_width, paper_height, paper_fit, tolerance=arc_chord_tolerance)
+    return commands, None
 
 
-def process_program(source):
+def plan_commands(commands):
+    """Run the optional plotting passes over a compiled history"""
+    report = {}
+    commands, paper = fit_commands(commands)
+    if paper is not None:
+        report["paper"] = {
+            "bounds": paper.bounds,
+            "scale": paper.scale,
+            "offset": paper.offset,
+            "segments_clipped": paper.segments_clipped,
+        }
+        if paper.segments_clipped:
+            print(f"Clipped {paper.segments_clipped} segments to the paper")
+    if skip_overdraw_enabled:
+        # Runs first so the travel pass can reorder the pieces it leaves.
+        commands, overdraw = skip_overdraw(commands, overdraw_tolerance)
+        report["overdraw"] = {
+            "segments_removed": overdraw.segments_removed,
+            "segments_trimmed": overdraw.segments_trimmed,
+            "length_removed": overdraw.length_removed,
+        }
+        metrics.OVERDRAW_SEGMENTS_REMOVED.inc(overdraw.segments_removed)
+        print(f"Overdraw pass removed {overdraw.segments_removed} segments and trimmed {overdraw.segments_trimmed}")
+    if optimize_travel_enabled:
+        commands, travel = optimize_travel(commands)
+        report["travel"] = {
+            "travel_before": travel.travel_before,
+            "travel_after": travel.travel_after,
+            "seconds_saved": travel.seconds_saved,
+        }
+        metrics.TRAVEL_SECONDS_SAVED.inc(travel.seconds_saved)
+        print(f"Travel optimizer saved an estimated {travel.seconds_saved:.1f}s of {travel.seconds_before:.1f}s")
+    return commands, report
+
+
+def compile_preview(source):
+    """Compile a program to the commands a preview should show"""
+    commands, _ = fit_commands(codetocommands(source))
+    return commands
+
+previews = PreviewRenderer(
+    compile_preview,
+    workers=preview_workers,
+    cache_size=preview_cache_size,
+    box=rect(paper_width, paper_height) if paper_width > 0 and paper_height > 0 else None,
+)
+
+
+def process_program(source, compiler=codetocommands, queued_at=None):
     global currentlyRunningProgram
+    if queued_at is not None:
+        metrics.QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
     try:
-        commands = codetocommands(source)
+        commands, _ = plan_commands(compiler(source))
+        if not device_arcs:
+            commands = expand_arcs(commands, arc_chord_tolerance)
+        transmission_started = time.perf_counter()
 
         s = None
         if platform == "windows":
@@ -33,30 +141,27 @@ def process_program(source):
         print("Begin execution")
 
         for item in commands:
-            commandstr = item[0] + (f" {str(round(item[1]))}" if len(item) > 1 else "")
-
-            if platform == "windows" and s:
-                s.send(commandstr.encode())
-            elif platform == "raspberrypi":
-                os.system(f"echo '{commandstr}' > /dev/rfcomm0")
-
-            if item[0] == "fd" or item[0] == "bk":
-                ## considering 100 setps takes 10 seconds, we can calculate the time taken for each step
-                time.sleep(item[1]*8/100)
-            elif item[0] == "rt" or item[0] == "lt":
-                steps = item[1]
-                time.sleep(steps*8/90)
-            else:
-                ## for other commands like pu, pd, we can sleep for 1 second
-                time.sleep(1)
+            command_started = time.perf_counter()
+            if is_device_command(item):
+                commandstr = format_command(item)
+
+                if platform == "windows" and s:
+                    s.send(commandstr.encode())
+                elif platform == "raspberrypi":
+                    os.system(f"echo '{commandstr}' > /dev/rfcomm0")
+
+            time.sleep(command_duration(item))
+            metrics.COMMAND_LATENCY_SECONDS.labels(item[0]).observe(time.perf_counter() - command_started)
         
         if platform == "windows" and s:
             s.close()
+        metrics.TRANSMISSION_SECONDS.observe(time.perf_counter() - transmission_started)
 
         print("Program Execution Complete")
 
     except Exception as e:
         print(f"Exception occured during exceution: {e}")
+        metrics.JOB_FAILURES.inc()
         currentlyRunningProgram = False
 
     currentlyRunningProgram = False
@@ -77,12 +182,69 @@ def start_execution():
     print(f"Recieved Program: {program_data}")
     
     # Start a background thread
-    thread = threading.Thread(target=process_program, args=(program_data,))
+    metrics.JOBS.inc()
+    thread = threading.Thread(target=process_program, args=(program_data, codetocommands, time.perf_counter()))
     thread.start()
     
     return jsonify({"status": "running", "message": "Execution started"}), 202
 
 
+@app.route('/compile', methods=['POST'])
+def compile_program():
+    """Compile a program to device commands without running it"""
+    program_data = request.form.get('program', '')
+    if request.is_json:
+        program_data = request.json.get('program', '')
+
+    profiler = Profiler() if request.args.get('profile') == '1' else None
+    try:
+        commands = codetocommands(program_data, profiler=profiler)
+        commands, plan = plan_commands(commands)
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)}), 400
+
+    result = {"status": "success", "commands": commands}
+    result.update(plan)
+    if profiler is not None:
+        result["profile"] = profiler.report()
+    return jsonify(result)
+
+
+@app.route('/preview', methods=['POST'])
+def preview_program():
+    """Render a program to a PNG image without running it"""
+    program_data = request.form.get('program', '')
+    size = request.form.get('size', preview_size)
+    if request.is_json:
+        program_data = request.json.get('program', '')
+        size = request.json.get('size', preview_size)
+
+    try:
+        size = min(max(int(size), 16), max_image_dimension)
+    except (TypeError, ValueError):
+        return jsonify({"status": "failed", "message": f"Invalid preview size: {size}"}), 400
+
+    try:
+        png = previews.render(program_data, size)
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)}), 400
+    return Response(png, mimetype='image/png')
+
+
+@app.route('/svg', methods=['POST'])
+def svg_program():
+    """Export a program's drawing as SVG, streamed as it is written"""
+    program_data = request.form.get('program', '')
+    if request.is_json:
+        program_data = request.json.get('program', '')
+
+    try:
+        commands = compile_preview(program_data)
+    except Exception as e:
+        return jsonify({"status": "failed", "message": str(e)}), 400
+    return Response(iter_svg(commands, box=previews.box), mimetype='image/svg+xml')
+
+
 @app.route('/visualstart', methods=['POST'])
 def visualstart():
     global currentlyRunningProgram
@@ -91,8 +253,16 @@ def visualstart():
     
     """Start execution in a separate thread"""
     # Get the image from the requets
+    request.max_content_length = max_upload_bytes + 64 * 1024
     image = request.files.get('image', None)
-    result = process_image(image)
+    if image is None:
+        return jsonify({"status": "failed", "message": "No image uploaded"}), 400
+    ## the vision stack (cv2, numpy, zxing) is slow to import, so load it on first use
+    from utils.visualprocessing import process_image
+    with PeakRSS() as memory:
+        result = process_image(image, max_bytes=max_upload_bytes, max_dimension=max_image_dimension)
+    result["memory"] = memory.report()
+    print(f"Image processing memory: {result['memory']}")
 
     if result["status"] == "failed":
         print("failed thing")
@@ -100,21 +270,50 @@ def visualstart():
 
     currentlyRunningProgram = True
     # Start a background thread
-    thread = threading.Thread(target=process_program, args=(" ".join(result['commands']),))
+    metrics.JOBS.inc()
+    thread = threading.Thread(target=process_program, args=(result['program'], tokenstocommands, time.perf_counter()))
     thread.start()    
 
-    return jsonify({"status": "running", "message": "Execution started", "commands": result['commands']}), 202
+    return jsonify({"status": "running", "message": "Execution started", "commands": result['commands'], "memory": result['memory']}), 202
+
+@app.route('/visualstream', methods=['POST'])
+def visualstream():
+    global currentlyRunningProgram
+    if currentlyRunningProgram:
+        return jsonify({"status": "failed", "message": "Another program is already running"}), 400
+
+    """Read a stream of length-prefixed JPEG frames until the program is stable"""
+    from utils.visualstream import scan_stream
+    result = scan_stream(request.stream, stable_frames=stream_stable_frames, max_frame_bytes=max_upload_bytes, max_dimension=max_image_dimension, max_frames=stream_max_frames, max_seconds=stream_max_seconds)
+
+    if result["status"] == "failed":
+        return jsonify(result), 400
+
+    currentlyRunningProgram = True
+    metrics.JOBS.inc()
+    thread = threading.Thread(target=process_program, args=(result['program'], tokenstocommands, time.perf_counter()))
+    thread.start()
+
+    return jsonify({"status": "running", "message": "Execution started", "commands": result['commands'], "frames": result['frames']}), 202
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.errorhandler(413)
+def upload_too_large(error):
+    return jsonify({"status": "failed", "message": f"Upload is larger than {max_upload_bytes} bytes."}), 413
 
 ## create a simple html page to input the program
 @app.route('/input', methods=['GET'])
 def input_program():
-    return app.send_static_file('input.html')
+    return assets.serve('input.html')
 
 
 @app.route("/")
 @app.route("/<path>")
 def home(path=""):
-    return app.send_static_file('index.html')
+    return assets.serve('index.html')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+#! /usr/bin/env python
+"""
+Recursion depth benchmark.
+
+Runs recursive procedures of increasing depth through `codetocommands`
+and reports time per Logo call, or the error that stopped them.
+
+    python -m benchmarks.depth
+    python -m benchmarks.depth --depth 100 1000 10000 --max-depth 20000
+"""
+
+import argparse
+import threading
+import time
+
+from utils.codetocommands import codetocommands, configure_depth
+
+PROGRAMS = {
+    # A self-call as the last statement runs without nesting.
+    "tail": "to walk :n if :n = 0 [stop] fd 1 walk :n - 1 end walk {}",
+    # Work after the recursive call keeps every frame alive.
+    "statement": "to walk :n if :n = 0 [stop] walk :n - 1 fd 1 end walk {}",
+    # Recursion inside an IF body.
+    "if-body": "to walk :n if :n > 0 [fd 1 walk :n - 1] end walk {}",
+    # Recursion inside an expression, as in OUTPUT 1 + SIZE ...
+    "expression": "to size :n if :n = 0 [output 0] output 1 + size :n - 1 end fd size {}",
+}
+
+
+def run_depths(depths):
+    # Build the shared grammar before timing anything.
+    codetocommands("fd 0")
+    rows = []
+    for name, template in PROGRAMS.items():
+        for depth in depths:
+            started = time.perf_counter()
+            try:
+                codetocommands(template.format(depth))
+            except Exception as ex:
+                rows.append((name, depth, None, "{}: {}".format(type(ex).__name__, ex)))
+                continue
+            elapsed = time.perf_counter() - started
+            rows.append((name, depth, elapsed, None))
+    return rows
+
+
+def main(args):
+    if args.max_depth is not None:
+        configure_depth(args.max_depth)
+    rows = []
+    # Run where the server runs programs: on a worker thread, not the
+    # main thread, which has its own stack size.
+    worker = threading.Thread(target=lambda: rows.extend(run_depths(args.depth)))
+    worker.start()
+    worker.join()
+    print("{:<12} {:>8} {:>10} {:>12}".format("program", "depth", "seconds", "us/call"))
+    for name, depth, elapsed, error in rows:
+        if error is None:
+            print("{:<12} {:>8} {:>10.4f} {:>12.1f}".format(
+                name, depth, elapsed, elapsed / depth * 1e6
+            ))
+        else:
+            print("{:<12} {:>8}   {}".format(name, depth, error))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark deep Logo recursion.")
+    parser.add_argument(
+        "--depth",
+        type=int,
+        nargs="+",
+        default=[100, 500, 999, 5000],
+        help="Recursion depths to run.",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=None,
+        help="Nesting budget to configure (default: LOGO_MAX_DEPTH default).",
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,190 @@
+#! /usr/bin/env python
+"""
+Interpreter benchmarks.
+
+Runs every program in `benchmarks/corpus` through `codetocommands` and
+reports grammar, parse and interpret time, commands emitted, peak traced
+memory and commands per second.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tracemalloc
+
+from utils.codetocommands import codetocommands
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+# Metrics where a larger value is worse, compared against a baseline.
+COMPARED = ("parse_seconds", "interpret_seconds", "peak_memory_kb")
+
+
+def load_corpus(folder=CORPUS, names=None):
+    programs = {}
+    for path in sorted(glob.glob(os.path.join(folder, "*.logo"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if names and name not in names:
+            continue
+        with open(path, "r") as f:
+            programs[name] = f.read()
+    return programs
+
+
+def run_program(script, repeat=5):
+    """
+    Benchmark one program.  Timings are the best of `repeat` runs; memory
+    is measured in a separate traced run so tracing does not skew timings.
+    """
+    best = None
+    for _ in range(repeat):
+        stats = {}
+        codetocommands(script, stats=stats)
+        if best is None:
+            best = stats
+        else:
+            for key in (
+                "grammar_seconds",
+                "pool_wait_seconds",
+                "parse_seconds",
+                "interpret_seconds",
+            ):
+                best[key] = min(best[key], stats[key])
+    tracemalloc.start()
+    try:
+        codetocommands(script)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best["peak_memory_kb"] = peak // 1024
+    if best["interpret_seconds"] > 0:
+        best["commands_per_second"] = best["commands"] / best["interpret_seconds"]
+    else:
+        best["commands_per_second"] = None
+    return best
+
+
+def run_corpus(programs, repeat=5):
+    results = {}
+    for name, script in programs.items():
+        results[name] = run_program(script, repeat=repeat)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Return a list of `(program, metric, old, new, change)` regressions where
+    `new` is more than `threshold` worse than `old`, plus programs whose
+    command count changed, which means the output itself is different.
+    """
+    regressions = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        if old["commands"] != new["commands"]:
+            regressions.append((name, "commands", old["commands"], new["commands"], None))
+        for metric in COMPARED:
+            before = old.get(metric)
+            after = new.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if change > threshold:
+                regressions.append((name, metric, before, after, change))
+    return regressions
+
+
+def format_results(report, baseline=None):
+    header = "{:<12} {:>10} {:>10} {:>10} {:>10} {:>9} {:>11} {:>12}".format(
+        "program",
+        "grammar",
+        "pool wait",
+        "parse",
+        "interpret",
+        "commands",
+        "peak KiB",
+        "commands/s",
+    )
+    lines = [header]
+    for name, r in report["results"].items():
+        line = "{:<12} {:>10.4f} {:>10.4f} {:>10.4f} {:>10.4f} {:>9} {:>11} {:>12.0f}".format(
+            name,
+            r["grammar_seconds"],
+            r["pool_wait_seconds"],
+            r["parse_seconds"],
+            r["interpret_seconds"],
+            r["commands"],
+            r["peak_memory_kb"],
+            r["commands_per_second"] or 0,
+        )
+        if baseline is not None and name in baseline["results"]:
+            old = baseline["results"][name]["interpret_seconds"]
+            if old:
+                line += " {:>+7.1%}".format((r["interpret_seconds"] - old) / old)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(args):
+    programs = load_corpus(names=args.program)
+    if len(programs) == 0:
+        print("No benchmark programs found.", file=sys.stderr)
+        return 1
+    report = run_corpus(programs, repeat=args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+    print(format_results(report, baseline))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if baseline is not None:
+        regressions = compare(baseline, report, threshold=args.threshold)
+        if regressions:
+            print("")
+            print("Regressions:")
+            for name, metric, before, after, change in regressions:
+                if change is None:
+                    print("  {} {}: {} -> {}".format(name, metric, before, after))
+                else:
+                    print("  {} {}: {:.4g} -> {:.4g} ({:+.1%})".format(
+                        name, metric, before, after, change
+                    ))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Logo interpreter.")
+    parser.add_argument(
+        "program", nargs="*", help="Only run these corpus programs (by name)."
+    )
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=5, help="Timed runs per program."
+    )
+    parser.add_argument("--save", metavar="FILE", help="Save results as JSON.")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="Compare against a saved baseline."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown that counts as a regression (default 0.10).",
+    )
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -0,0 +1,113 @@
+#! /usr/bin/env python
+"""
+Server startup benchmark.
+
+Measures, in fresh processes, how long it takes to import `app` and to get
+the first response from `/start` and `/compile`, and prints the slowest
+imports from `python -X importtime`.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --top 25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAM = "repeat 4 [fd 10 rt 90]"
+
+# Runs in the child process.  `/start` answers as soon as the job is
+# queued; `/compile` waits for the program to be compiled.
+PROBE = r"""
+import json, os, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.post("/compile", json={"program": sys.argv[1]})
+compiled = time.perf_counter()
+client.post("/start", json={"program": sys.argv[1]})
+responded = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "first_compile_seconds": compiled - imported,
+    "first_start_seconds": responded - compiled,
+}))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env["PLATFORM"] = "none"
+    env["WARM_UP_IN_BACKGROUND"] = "false"
+    return env
+
+
+def measure_startup(runs=3):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, PROGRAM],
+            cwd=ROOT,
+            env=child_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in samples[0]
+    }
+
+
+def import_times(module="app"):
+    """
+    Return `(cumulative_us, self_us, name)` for every module imported by
+    `module`, from `python -X importtime`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        cwd=ROOT,
+        env=child_env(),
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def main(args):
+    timings = measure_startup(runs=args.runs)
+    print("median of {} fresh processes".format(args.runs))
+    print("  import app      {:>8.3f}s".format(timings["import_seconds"]))
+    print("  first /compile  {:>8.3f}s".format(timings["first_compile_seconds"]))
+    print("  first /start    {:>8.3f}s".format(timings["first_start_seconds"]))
+    print("")
+    print("{:>10} {:>10}  module".format("cumulative", "self"))
+    rows = sorted(import_times(), reverse=True)
+    for cumulative_us, self_us, name in rows[: args.top]:
+        print("{:>8.1f}ms {:>8.1f}ms  {}".format(cumulative_us / 1000, self_us / 1000, name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark server startup.")
+    parser.add_argument(
+        "--runs", type=int, default=3, help="Fresh processes to time (median)."
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="Slowest imports to list."
+    )
+    args = parser.parse_args()
+    main(args)
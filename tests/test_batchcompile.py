@@ -0,0 +1,24 @@
+from utils.batchcompile import compile_file, output_paths
+from utils.codetocommands import codetocommands
+from utils.device import expand_arcs, format_command
+
+PROGRAM = "pd arc 90 50 fd 10"
+
+
+def _compiled(tmp_path, arc_tolerance):
+    script = tmp_path / "arc.logo"
+    script.write_text(PROGRAM)
+    assert compile_file(str(script), arc_tolerance=arc_tolerance) == (str(script), None)
+    with open(output_paths(str(script))[0]) as f:
+        return f.read().splitlines()
+
+
+def test_arcs_expanded_as_the_server_sends_them(tmp_path):
+    sent = expand_arcs(codetocommands(PROGRAM), 0.5)
+    lines = _compiled(tmp_path, 0.5)
+    assert lines == [format_command(item) for item in sent]
+    assert not any(line.startswith("arc ") for line in lines)
+
+
+def test_native_arcs_kept_for_device_arcs(tmp_path):
+    assert "arc 50 90 lt" in _compiled(tmp_path, None)
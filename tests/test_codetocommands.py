@@ -0,0 +1,27 @@
+import threading
+import time
+
+from utils.codetocommands import codetocommands, get_grammar, pool
+
+HOLD_SECONDS = 0.3
+
+
+def test_pool_wait_is_not_grammar_time(monkeypatch):
+    get_grammar()
+    monkeypatch.setattr(pool, "max_size", max(pool.size, 1))
+    held = [pool.acquire() for _ in range(pool.max_size)]
+
+    def release():
+        time.sleep(HOLD_SECONDS)
+        for interpreter in held:
+            pool.release(interpreter)
+
+    releaser = threading.Thread(target=release)
+    releaser.start()
+    stats = {}
+    try:
+        codetocommands("fd 10", stats=stats)
+    finally:
+        releaser.join()
+    assert stats["pool_wait_seconds"] >= HOLD_SECONDS / 2
+    assert stats["grammar_seconds"] < HOLD_SECONDS / 2
@@ -0,0 +1,50 @@
+from utils.codetocommands import codetocommands
+from utils.interpreter.profiler import Profiler
+
+
+def _printed(capfd, program, profiler=None):
+    # The history is read from the turtle, so the program must use it.
+    codetocommands("pd " + program, profiler)
+    return capfd.readouterr().out.split("\n")[:-1]
+
+
+def test_memo_keeps_arrays_and_lists_apart(capfd):
+    program = """
+    to f :x
+      output vectorp :x
+    end
+    print f [1 2]
+    print f vector [1 2]
+    print f [1 2]
+    """
+    assert _printed(capfd, program) == ["false", "true", "false"]
+
+
+def test_infix_arithmetic_on_arrays(capfd):
+    program = """
+    make "v vector [1 2]
+    show :v * 2 + 1
+    show vector [1 2] * 2
+    show 2 * vector [1 2]
+    show (vector [1 2]) + (vector [3 4])
+    show (vector [1 2]) / 2
+    """
+    assert _printed(capfd, program) == ["[3 5]", "[2 4]", "[2 4]", "[4 6]", "[0.5 1.0]"]
+
+
+def test_profiler_counts_infix_arithmetic_and_tail_calls(capfd):
+    profiler = Profiler()
+    program = """
+    to spiral :n :size
+      if :n = 0 [stop]
+      fd :size * 2
+      rt 90
+      spiral :n - 1 :size + 1
+    end
+    spiral 10 3
+    """
+    _printed(capfd, program, profiler)
+    report = profiler.report()
+    assert report["procedures"]["spiral"]["calls"] == 11
+    assert report["primitives"]["product"]["calls"] == 10
+    assert report["primitives"]["sum"]["calls"] == 10
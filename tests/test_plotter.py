@@ -0,0 +1,133 @@
+import math
+
+import pytest
+
+from utils.plotter import geometry
+from utils.plotter.overdraw import skip_overdraw
+from utils.plotter.paper import fit_to_paper, transform
+from utils.plotter.travel import optimize_travel
+
+# Rounding to whole units moves ink this far, plus up to half a degree
+# of heading along the longest line drawn.
+TOLERANCE = 1.0
+HEADING_ERROR = math.sin(math.radians(0.5))
+
+
+def _ink(parts):
+    return [
+        segment
+        for part in parts
+        if isinstance(part, geometry.Stroke)
+        for segment in part.segments
+    ]
+
+
+def _distance_to_segment(point, segment):
+    (x0, y0), (x1, y1) = segment.start, segment.end
+    dx, dy = x1 - x0, y1 - y0
+    length = dx * dx + dy * dy
+    t = 0 if length == 0 else ((point[0] - x0) * dx + (point[1] - y0) * dy) / length
+    t = min(max(t, 0), 1)
+    return math.hypot(point[0] - x0 - dx * t, point[1] - y0 - dy * t)
+
+
+def _stray_ink(ink, commands):
+    """
+    Points on the lines drawn by `commands` that are further from every
+    segment in `ink` than rounding explains.
+    """
+    drawn = _ink(geometry.trace(commands))
+    longest = max((segment.length() for segment in drawn), default=0)
+    tolerance = TOLERANCE + longest * HEADING_ERROR
+    stray = []
+    for segment in drawn:
+        for k in range(11):
+            t = k / 10
+            point = (
+                segment.start[0] + (segment.end[0] - segment.start[0]) * t,
+                segment.start[1] + (segment.end[1] - segment.start[1]) * t,
+            )
+            if min(_distance_to_segment(point, line) for line in ink) > tolerance:
+                stray.append(point)
+    return stray
+
+
+def _star(points=7, size=150):
+    commands = [("pd",)]
+    for _ in range(points):
+        commands += [("fd", size), ("rt", 180 - 180 / points)]
+    return commands
+
+
+RETRACE_THEN_JUMP = [
+    ("pd",),
+    ("fd", 10),
+    ("bk", 10),
+    ("pu",),
+    ("rt", 37.4),
+    ("fd", 400),
+    ("pd",),
+    ("fd", 10),
+]
+
+PROGRAMS = {
+    "retrace then jump": RETRACE_THEN_JUMP,
+    "scattered strokes": [
+        item
+        for n in range(12)
+        for item in [
+            ("pu",),
+            ("rt", 31.7 * n),
+            ("fd", 97.3 + n),
+            ("pd",),
+            ("fd", 13.1),
+            ("bk", 13.1),
+        ]
+    ],
+    "star": _star(),
+}
+
+
+def _fit(commands):
+    return fit_to_paper(commands, 300, 200, "fit")
+
+
+PASSES = {
+    "overdraw": lambda commands: skip_overdraw(commands)[0],
+    "travel": lambda commands: optimize_travel(commands)[0],
+    "fit": lambda commands: _fit(commands)[0],
+    "clip": lambda commands: fit_to_paper(commands, 100, 100)[0],
+}
+
+
+@pytest.mark.parametrize("program", sorted(PROGRAMS))
+@pytest.mark.parametrize("name", sorted(PASSES))
+def test_passes_only_draw_input_ink(program, name):
+    commands = PROGRAMS[program]
+    parts = geometry.trace(commands)
+    if name == "fit":
+        report = _fit(commands)[1]
+        parts = transform(parts, report.scale, report.offset)
+    assert _stray_ink(_ink(parts), PASSES[name](commands)) == []
+
+
+def test_emit_reaches_stroke_start_before_pen_down():
+    commands = skip_overdraw(RETRACE_THEN_JUMP)[0]
+    second_stroke = commands.index(("pd",), 1)
+    assert ("fd", 10) in commands[second_stroke:]
+    assert all(item[0] == "lt" or item[0] == "fd" for item in commands[second_stroke + 1 :])
+    assert _stray_ink(_ink(geometry.trace(RETRACE_THEN_JUMP)), commands) == []
+
+
+def test_emit_rounds_to_whole_units():
+    commands = _fit(_star())[0]
+    assert commands != _star()
+    for item in commands:
+        for arg in item[1:]:
+            assert isinstance(arg, int)
+
+
+@pytest.mark.parametrize("program", sorted(PROGRAMS))
+def test_traced_bounds_match_history_bounds(program):
+    commands = PROGRAMS[program] + [("arc", 40, 270, "lt")]
+    assert geometry.bounds(geometry.trace(commands)) == geometry.ink_bounds(commands)
@@ -0,0 +1,49 @@
+from utils.visualcompiler import Card, card_tokens, compile_cards
+
+SIZE = 10
+
+
+def _layout(*rows):
+    """
+    Cards for `rows` of `(indent, [texts])`, one card size apart.
+    """
+    cards = [Card("start", 0, 0, SIZE, SIZE)]
+    for n, (indent, texts) in enumerate(rows, start=1):
+        for k, text in enumerate(texts):
+            cards.append(Card(text, (indent + k) * SIZE, n * 2 * SIZE, SIZE, SIZE))
+    return cards
+
+
+def test_indentation_opens_a_block():
+    cards = _layout((0, ["repeat 4"]), (1, ["fd 100"]), (1, ["rt 90"]))
+    assert compile_cards(cards) == ["repeat", 4, ["fd", 100, "rt", 90]]
+
+
+def test_brackets_with_indented_rows():
+    cards = _layout(
+        (0, ["repeat 4 ["]), (1, ["fd 100"]), (1, ["rt 90"]), (0, ["]"]), (0, ["fd 5"])
+    )
+    assert compile_cards(cards) == ["repeat", 4, ["fd", 100, "rt", 90], "fd", 5]
+
+
+def test_brackets_inside_an_indented_block():
+    cards = _layout(
+        (0, ["repeat 2"]),
+        (1, ["repeat 4 ["]),
+        (2, ["fd 100"]),
+        (2, ["rt 90"]),
+        (1, ["]"]),
+        (1, ["rt 45"]),
+    )
+    assert compile_cards(cards) == [
+        "repeat",
+        2,
+        ["repeat", 4, ["fd", 100, "rt", 90], "rt", 45],
+    ]
+
+
+def test_card_tokens_use_the_grammar():
+    assert card_tokens("repeat 4 [") == ["repeat", 4, "["]
+    assert card_tokens('make "x 5') == ["make", '"x', 5]
+    assert card_tokens("fd -10 ]") == ["fd", -10, "]"]
+    assert card_tokens("fd (sum 1 2)") == ["fd", 3]
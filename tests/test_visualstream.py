@@ -0,0 +1,50 @@
+import struct
+import threading
+import time
+
+from utils import visualstream
+
+
+class StalledStream:
+    """
+    Sends one undecodable frame, then blocks in `read` until released.
+    """
+
+    def __init__(self):
+        self.data = struct.pack(">I", 4) + b"junk"
+        self.release = threading.Event()
+
+    def read(self, n):
+        if self.data:
+            chunk, self.data = self.data[:n], self.data[n:]
+            return chunk
+        self.release.wait()
+        return b""
+
+
+def test_scan_gives_up_on_a_stalled_stream(monkeypatch):
+    monkeypatch.setattr(visualstream, "READER_JOIN_SECONDS", 0.1)
+    stream = StalledStream()
+    started = time.monotonic()
+    result = visualstream.scan_stream(stream, max_seconds=0.3)
+    elapsed = time.monotonic() - started
+    stream.release.set()
+    assert result["status"] == "failed"
+    assert elapsed < 2
+
+
+def test_scan_stops_after_max_frames():
+    frame = struct.pack(">I", 4) + b"junk"
+
+    class Endless:
+        reads = 0
+
+        def read(self, n):
+            Endless.reads += 1
+            return frame[:n] if n < len(frame) else frame
+
+    result = visualstream.scan_stream(Endless(), max_frames=20, max_seconds=5)
+    reads = Endless.reads
+    time.sleep(0.1)
+    assert result["status"] == "failed"
+    assert Endless.reads == reads
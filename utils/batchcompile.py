@@ -0,0 +1,219 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+from .codetocommands import create_interpreter, get_grammar, run_tokens
+from .device import expand_arcs, format_command, program_duration
+from .interpreter.interpreter import parse_tokens
+from .plotter.svg import write_svg
+
+COMMANDS_SUFFIX = ".cmds"
+STATS_SUFFIX = ".stats.json"
+SVG_SUFFIX = ".svg"
+
+# Per-process state, built once by `init_worker()` and reused for every
+# file the worker compiles.  The primitive table is shared at import.
+_grammar = None
+_interpreter = None
+
+
+def init_worker():
+    """
+    Build the grammar and interpreter once per worker process.
+    """
+    global _grammar, _interpreter
+    _grammar = get_grammar()
+    _interpreter = create_interpreter(_grammar)
+
+
+def output_paths(path):
+    base = os.path.splitext(path)[0]
+    return base + COMMANDS_SUFFIX, base + STATS_SUFFIX
+
+
+def svg_path(path):
+    return os.path.splitext(path)[0] + SVG_SUFFIX
+
+
+def find_scripts(paths):
+    """
+    Expand files and directories into a sorted list of `.logo` scripts.
+    """
+    scripts = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for filename in files:
+                    if filename.endswith(".logo"):
+                        scripts.append(os.path.join(root, filename))
+        else:
+            scripts.append(path)
+    return sorted(set(scripts))
+
+
+def is_up_to_date(path, write_stats, write_svg_file=False):
+    commands_path, stats_path = output_paths(path)
+    targets = [commands_path, stats_path] if write_stats else [commands_path]
+    if write_svg_file:
+        targets.append(svg_path(path))
+    try:
+        mtime = os.path.getmtime(path)
+        return all(os.path.getmtime(target) >= mtime for target in targets)
+    except OSError:
+        return False
+
+
+def compile_file(path, write_stats=False, write_svg_file=False, arc_tolerance=None):
+    """
+    Compile one script and write its command file next to it.
+    Unless `arc_tolerance` is None, arcs are written as chords within that
+    tolerance, as the server sends them to a device without native arcs.
+    Returns `(path, error)`, where `error` is None on success.
+    """
+    if _grammar is None:
+        init_worker()
+    commands_path, stats_path = output_paths(path)
+    try:
+        with open(path, "r") as f:
+            script = f.read()
+        stats = {}
+        started = time.perf_counter()
+        tokens = parse_tokens(_grammar, script)
+        stats["parse_seconds"] = time.perf_counter() - started
+        commands = run_tokens(_interpreter, tokens, stats=stats)
+    except Exception as ex:
+        return (path, "{}: {}".format(type(ex).__name__, ex))
+    finally:
+        _interpreter.reset()
+    try:
+        sent = commands
+        if arc_tolerance is not None:
+            sent = expand_arcs(commands, arc_tolerance)
+        # Format everything before opening the file, so a failure doesn't
+        # leave a half-written command file behind.
+        text = "".join(format_command(item) + "\n" for item in sent)
+        with open(commands_path, "w") as f:
+            f.write(text)
+        if write_svg_file:
+            with open(svg_path(path), "w") as f:
+                write_svg(commands, f)
+        if write_stats:
+            stats["estimated_seconds"] = program_duration(sent)
+            with open(stats_path, "w") as f:
+                json.dump(stats, f, indent=2, sort_keys=True)
+                f.write("\n")
+    except Exception as ex:
+        return (path, "{}: {}".format(type(ex).__name__, ex))
+    return (path, None)
+
+
+def compile_all(
+    scripts, jobs=None, write_stats=False, write_svg_file=False, arc_tolerance=None
+):
+    """
+    Compile `scripts` across a pool of `jobs` worker processes.
+    Yields `(path, error)` as files finish.
+    """
+    if jobs == 1:
+        init_worker()
+        for path in scripts:
+            yield compile_file(path, write_stats, write_svg_file, arc_tolerance)
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker
+    ) as executor:
+        futures = [
+            executor.submit(
+                compile_file, path, write_stats, write_svg_file, arc_tolerance
+            )
+            for path in scripts
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="pablo-compile",
+        description="Compile Logo scripts to device command files.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", metavar="PATH", help="Logo scripts or folders of scripts."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Worker processes (default: one per core).",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Also write timing and size stats to a `.stats.json` file.",
+    )
+    parser.add_argument(
+        "--svg",
+        action="store_true",
+        help="Also write the drawing to an `.svg` file.",
+    )
+    parser.add_argument(
+        "--device-arcs",
+        action=argparse.BooleanOptionalAction,
+        default=os.getenv("DEVICE_ARCS", "false").lower() == "true",
+        help="Write native `arc` commands instead of chords "
+        "(default: DEVICE_ARCS, as for the server).",
+    )
+    parser.add_argument(
+        "--arc-tolerance",
+        type=float,
+        default=float(os.getenv("ARC_CHORD_TOLERANCE", "0.5")),
+        help="Largest distance between an arc and its chords "
+        "(default: ARC_CHORD_TOLERANCE or 0.5).",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Recompile scripts whose outputs are already up to date.",
+    )
+    args = parser.parse_args(argv)
+
+    scripts = find_scripts(args.paths)
+    if not args.force:
+        scripts = [
+            path
+            for path in scripts
+            if not is_up_to_date(path, args.stats, args.svg)
+        ]
+    if len(scripts) == 0:
+        print("Nothing to compile.")
+        return 0
+
+    started = time.perf_counter()
+    failures = 0
+    for path, error in compile_all(
+        scripts,
+        jobs=args.jobs,
+        write_stats=args.stats,
+        write_svg_file=args.svg,
+        arc_tolerance=None if args.device_arcs else args.arc_tolerance,
+    ):
+        if error is None:
+            print("compiled {}".format(path))
+        else:
+            failures += 1
+            print("failed {}: {}".format(path, error), file=sys.stderr)
+    print(
+        "{} compiled, {} failed in {:.2f}s".format(
+            len(scripts) - failures, failures, time.perf_counter() - started
+        )
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
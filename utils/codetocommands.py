@@ -1,11 +1,48 @@
-from .interpreter.interpreter import make_token_grammar, LogoInterpreter, parse_tokens
+from .interpreter.interpreter import make_token_grammar, LogoInterpreter, parse_tokens, DEFAULT_MAX_DEPTH
 from .interpreter import logturtle
 from .interpreter import errors
+from .interpreter.pool import InterpreterPool
+from . import metrics
 import sys
+import threading
+import time
 
-def codetocommands(script):
-    grammar = make_token_grammar()
+_grammar = None
+_grammar_lock = threading.Lock()
+
+def get_grammar():
+    """
+    Build the token grammar once and share it.  Parsing creates a new
+    parser instance per script, so the grammar itself holds no state.
+    """
+    global _grammar
+    if _grammar is None:
+        with _grammar_lock:
+            if _grammar is None:
+                with metrics.GRAMMAR_BUILD_SECONDS.time():
+                    _grammar = make_token_grammar()
+    return _grammar
+
+# Python frames used by one nested Logo procedure call in the worst common
+# case, a recursive call inside an expression inside an IF body.
+FRAMES_PER_CALL = 12
+max_depth = DEFAULT_MAX_DEPTH
+
+def configure_depth(depth):
+    """
+    Set how deeply Logo procedure calls may nest, and raise the Python
+    recursion limit so that budget is reachable.  Tail self-calls do not
+    count against it.
+    """
+    global max_depth
+    max_depth = depth
+    limit = depth * FRAMES_PER_CALL + 2000
+    if sys.getrecursionlimit() < limit:
+        sys.setrecursionlimit(limit)
+
+def create_interpreter(grammar):
     interpreter = LogoInterpreter.create_interpreter()
+    interpreter.max_depth = max_depth
     interpreter.turtle_backend_args = dict(input_handler=interpreter.receive_input)
 
     interpreter.grammar = grammar
@@ -13,19 +50,80 @@ def codetocommands(script):
     interpreter.script_folders = script_folders
 
     interpreter.turtle_backend = logturtle.LogTurtleEnv.create_turtle_env()
+    return interpreter
+
+def _new_pooled_interpreter():
+    return create_interpreter(get_grammar())
+
+pool = InterpreterPool(_new_pooled_interpreter)
+configure_depth(DEFAULT_MAX_DEPTH)
 
-    tokens = parse_tokens(grammar, script)
+def configure_pool(max_size, idle_timeout=60.0):
+    """
+    Set the bounds of the shared interpreter pool.
+    """
+    pool.max_size = max_size
+    pool.idle_timeout = idle_timeout
 
+def run_tokens(interpreter, tokens, profiler=None, stats=None):
+    if profiler is not None:
+        profiler.install(interpreter)
     try:
-        result = interpreter.process_commands(tokens)
+        with metrics.INTERPRET_SECONDS.time() as timer:
+            result = interpreter.process_commands(tokens)
+    except RecursionError:
+        print("Processed tokens: {}".format(tokens.processed), file=sys.stderr)
+        raise errors.LogoError("The program nests too deeply to run.")
     except Exception as ex:
         print("Processed tokens: {}".format(tokens.processed), file=sys.stderr)
         raise ex
+    finally:
+        if profiler is not None:
+            profiler.uninstall()
     if result is not None:
         raise errors.LogoError("You don't say what to do with `{}`.".format(result))
 
     if interpreter.is_turtle_active():
         interpreter.turtle_backend.wait_complete()
 
-    return interpreter._turtle.getHistory()
+    history = interpreter._turtle.getHistory()
+    metrics.HISTORY_COMMANDS.observe(len(history))
+    if stats is not None:
+        stats["interpret_seconds"] = timer.elapsed
+        stats["commands"] = len(history)
+    return history
+
+def codetocommands(script, profiler=None, stats=None):
+    """
+    Compile Logo source to device commands.
+    If `stats` is a dict it is filled with the time spent in each stage,
+    including `pool_wait_seconds` spent waiting for a free interpreter.
+    """
+    started = time.perf_counter()
+    grammar = get_grammar()
+    grammar_seconds = time.perf_counter() - started
+    with pool.interpreter() as interpreter:
+        pool_wait_seconds = time.perf_counter() - started - grammar_seconds
+
+        with metrics.PARSE_SECONDS.time() as parse_timer:
+            tokens = parse_tokens(grammar, script)
+        if stats is not None:
+            stats["grammar_seconds"] = grammar_seconds
+            stats["pool_wait_seconds"] = pool_wait_seconds
+            stats["parse_seconds"] = parse_timer.elapsed
+
+        return run_tokens(interpreter, tokens, profiler, stats)
+
+def tokenstocommands(token_list, profiler=None, stats=None):
+    """
+    Run an already tokenized program, such as the output of the visual
+    compiler, without generating and re-parsing source text.
+    """
+    started = time.perf_counter()
+    with pool.interpreter() as interpreter:
+        if stats is not None:
+            stats["pool_wait_seconds"] = time.perf_counter() - started
+
+        tokens = interpreter.make_stream(token_list)
 
+        return run_tokens(interpreter, tokens, profiler, stats)
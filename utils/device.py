@@ -0,0 +1,111 @@
+import math
+import numbers
+
+# WAIT counts in sixtieths of a second, as in UCBLogo.
+WAIT_TICKS_PER_SECOND = 60
+# History entries the transmitter carries out itself instead of sending.
+# Pen colour and size only matter to previews.
+HOST_COMMANDS = frozenset(["wait", "pencolor", "pensize"])
+
+
+def is_device_command(item):
+    """
+    True if a history item is sent to the device.
+    """
+    return item[0] not in HOST_COMMANDS
+
+
+def format_command(item):
+    """
+    Format a history item as the text sent to the device, e.g. `fd 100`.
+    """
+    return " ".join([item[0]] + [_format_arg(arg) for arg in item[1:]])
+
+
+def _format_arg(arg):
+    # Only device commands need whole numbers; host commands such as a
+    # pen colour are written as they are.
+    if isinstance(arg, numbers.Number):
+        return str(round(arg))
+    return str(arg)
+
+
+def command_duration(item):
+    """
+    Seconds the device takes to carry out a command.
+    Negative moves and turns take as long as positive ones.
+    """
+    if item[0] == "fd" or item[0] == "bk":
+        ## considering 100 setps takes 10 seconds, we can calculate the time taken for each step
+        return abs(item[1])*8/100
+    elif item[0] == "rt" or item[0] == "lt":
+        steps = abs(item[1])
+        return steps*8/90
+    elif item[0] == "arc":
+        return arc_length(item[1], item[2])*8/100
+    elif item[0] == "wait":
+        return item[1] / WAIT_TICKS_PER_SECOND
+    elif item[0] in HOST_COMMANDS:
+        return 0
+    ## for other commands like pu, pd, we can sleep for 1 second
+    return 1
+
+
+def program_duration(commands):
+    """
+    Estimated seconds for the device to run a whole program.
+    """
+    return sum(command_duration(item) for item in commands)
+
+
+def arc_length(radius, sweep):
+    return abs(radius) * math.radians(sweep)
+
+
+def arc_segments(radius, sweep, tolerance):
+    """
+    Number of chords needed to draw an arc, so that no chord strays more
+    than `tolerance` units from the true curve.
+    """
+    radius = abs(radius)
+    if radius <= tolerance:
+        # Any chord up to a half circle is close enough.
+        return max(1, math.ceil(sweep / 180))
+    step = 2 * math.degrees(math.acos(1 - tolerance / radius))
+    return max(1, math.ceil(sweep / step))
+
+
+def expand_arc(item, tolerance):
+    """
+    Replace an `arc` history item with turns and chords, for devices that
+    can't drive arcs themselves.  A half turn before the first chord and
+    after the last keeps every vertex on the circle.  The device turns in
+    whole degrees, so each turn is rounded and its error carried forward.
+    """
+    _, radius, sweep, direction = item
+    n = arc_segments(radius, sweep, tolerance)
+    step = sweep / n
+    chord = 2 * abs(radius) * math.sin(math.radians(step) / 2)
+    commands = []
+    turned = 0
+    for i in range(n + 1):
+        target = round(min(step * (i + 0.5), sweep))
+        if target != turned:
+            commands.append((direction, target - turned))
+            turned = target
+        if i < n:
+            commands.append(("fd", chord))
+    return commands
+
+
+def expand_arcs(commands, tolerance):
+    """
+    Return `commands` with every arc expanded by `expand_arc()`.
+    """
+    expanded = []
+    for item in commands:
+        if item[0] == "arc":
+            expanded.extend(expand_arc(item, tolerance))
+        else:
+            expanded.append(item)
+    return expanded
@@ -0,0 +1,161 @@
+"""
+Parse-time compilation of arithmetic.
+
+The token grammar turns `a + b`, `a * b` and `a / b` into `DelayedValue`
+trees with precedence already resolved.  Trees whose leaves are numbers
+and variables become `Expression` nodes that the interpreter evaluates
+directly, instead of re-reading them as prefix tokens.  Prefix calls such
+as `sum 1 2` or `sin 30` on literal numbers are folded to their value.
+"""
+
+import numbers
+
+import attr
+
+from . import errors, procedure
+
+SYMBOLS = {"sum": "+", "difference": "-", "product": "*", "quotient": "/"}
+INFIX_OPERATORS = frozenset(["+", "-", "*", "/", "<", ">", "=", "<=", ">=", "<>"])
+# Primitives that are folded when every input is a literal number.
+FOLDABLE = {
+    "sum": 2,
+    "difference": 2,
+    "product": 2,
+    "quotient": 2,
+    "power": 2,
+    "remainder": 2,
+    "modulo": 2,
+    "sin": 1,
+    "cos": 1,
+    "sqrt": 1,
+    "int": 1,
+    "round": 1,
+}
+VARIADIC = frozenset(["sum", "product"])
+
+
+@attr.s(eq=False)
+class Expression:
+    """
+    Compiled infix arithmetic, e.g. `:size * 0.7`.
+    Operands are numbers, variable references (`:name`) or expressions.
+    """
+
+    op = attr.ib()
+    left = attr.ib()
+    right = attr.ib()
+    func = attr.ib(repr=False)
+
+    @classmethod
+    def create_expression(cls, op, left, right):
+        return cls(op, left, right, procedure.PRIMITIVES[op].primitive_func)
+
+    def evaluate(self, logo):
+        return self.func(
+            logo, _evaluate_operand(logo, self.left), _evaluate_operand(logo, self.right)
+        )
+
+    def variables(self):
+        """
+        Yield the names of the variables this expression reads.
+        """
+        for operand in (self.left, self.right):
+            if isinstance(operand, Expression):
+                yield from operand.variables()
+            elif isinstance(operand, str):
+                yield operand[1:]
+
+    def __str__(self):
+        return "({} {} {})".format(self.left, SYMBOLS[self.op], self.right)
+
+
+def _evaluate_operand(logo, operand):
+    if isinstance(operand, Expression):
+        return logo.evaluate_expression(operand)
+    if isinstance(operand, str):
+        return logo.get_variable_value(operand[1:])
+    return operand
+
+
+def compile_expression(value):
+    """
+    Compile a `DelayedValue` tree into an `Expression`.
+    Returns None if an operand is something other than a number, a
+    variable or another compilable tree, such as a reporter like HEADING.
+    """
+    if not hasattr(value, "op"):
+        if _is_number(value):
+            return value
+        if isinstance(value, str) and value.startswith(":") and len(value) > 1:
+            return value
+        return None
+    if value.op not in SYMBOLS:
+        return None
+    left = compile_expression(value.left)
+    right = compile_expression(value.right)
+    if left is None or right is None:
+        return None
+    if _is_number(left) and _is_number(right):
+        folded = _fold(value.op, (left, right))
+        if folded is not None:
+            return folded
+    return Expression.create_expression(value.op, left, right)
+
+
+def fold_constants(tokens):
+    """
+    Replace prefix calls of `FOLDABLE` primitives on literal numbers with
+    their value, working from the right so nested calls fold too.
+    Lists are data until run, so only code at this level and inside
+    parentheses is folded.
+    """
+    tokens = list(tokens)
+    n = len(tokens) - 1
+    while n >= 0:
+        token = tokens[n]
+        if isinstance(token, tuple):
+            if token and isinstance(token[0], str):
+                # The head of `(sum 1 2 3)` takes every input in the form.
+                form = (token[0],) + tuple(fold_constants(token[1:]))
+            else:
+                form = tuple(fold_constants(token))
+            tokens[n] = _fold_special_form(form)
+        elif isinstance(token, str):
+            arity = FOLDABLE.get(token.lower())
+            if arity is not None:
+                args = tokens[n + 1 : n + 1 + arity]
+                following = tokens[n + 1 + arity : n + 2 + arity]
+                if (
+                    len(args) == arity
+                    and all(_is_number(arg) for arg in args)
+                    and not (following and following[0] in INFIX_OPERATORS)
+                ):
+                    folded = _fold(token.lower(), args)
+                    if folded is not None:
+                        tokens[n : n + 1 + arity] = [folded]
+        n -= 1
+    return tokens
+
+
+def _fold_special_form(form):
+    if len(form) > 1 and isinstance(form[0], str):
+        name = form[0].lower()
+        args = form[1:]
+        if name in VARIADIC or FOLDABLE.get(name) == len(args):
+            if all(_is_number(arg) for arg in args):
+                folded = _fold(name, args)
+                if folded is not None:
+                    return folded
+    return form
+
+
+def _fold(name, args):
+    try:
+        return procedure.PRIMITIVES[name].primitive_func(None, *args)
+    except (errors.LogoError, ArithmeticError, ValueError, TypeError):
+        # Leave it for run time, which reports the error in context.
+        return None
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
@@ -1,6 +1,5 @@
 #! /usr/bin/env python
 
-import argparse
 import collections
 import itertools
 import numbers
@@ -10,7 +9,13 @@ import sys
 import attr
 import parsley
 
-from . import errors, procedure, logturtle
+from . import errors, procedure, logturtle, purity
+from .expression import Expression, compile_expression, fold_constants
+from .logoarray import LogoArray
+from .logolist import LIST_TYPES
+
+# Default limit on nested user procedure calls.  See `LogoInterpreter.max_depth`.
+DEFAULT_MAX_DEPTH = 1000
 
 
 @attr.s
@@ -19,7 +24,7 @@ class LogoInterpreter:
     Logo interpreter
     """
 
-    primitives = attr.ib(default=attr.Factory(dict))
+    primitives = attr.ib(default=procedure.PRIMITIVES)
     procedures = attr.ib(default=attr.Factory(dict))
     scope_stack = attr.ib(default=attr.Factory(list))
     repcount_stack = attr.ib(default=attr.Factory(list))
@@ -35,14 +40,45 @@ class LogoInterpreter:
     debug_procs = attr.ib(default=False)
     debug_primitives = attr.ib(default=False)
     debug_tokens = attr.ib(default=False)
+    make_stream = attr.ib(
+        default=attr.Factory(lambda: TokenStream.make_stream), repr=False
+    )
+    max_depth = attr.ib(default=DEFAULT_MAX_DEPTH)
+    call_depth = attr.ib(default=0)
+    memo = attr.ib(default=attr.Factory(purity.MemoCache), repr=False)
+    pure_procedures = attr.ib(default=attr.Factory(dict), repr=False)
 
     @classmethod
-    def create_interpreter(cls):
-        interpreter = cls()
+    def create_interpreter(cls, primitives=procedure.PRIMITIVES):
+        interpreter = cls(primitives=primitives)
         interpreter.scope_stack.append({})
-        interpreter.primitives.update(procedure.create_primitives_map())
         return interpreter
 
+    def reset(self):
+        """
+        Restore a clean state so the interpreter can run another script.
+        The grammar, primitives and turtle backend are kept.
+        """
+        self.procedures = {}
+        self.scope_stack = [{}]
+        self.repcount_stack = []
+        self.placeholder_stack = []
+        self.call_depth = 0
+        self.forget_memo()
+        if self._turtle is not None:
+            self._turtle.reset()
+        screen = self.turtle_backend.screen
+        if screen is not None:
+            screen.reset()
+
+    def forget_memo(self):
+        """
+        Drop memoized results and purity analysis, e.g. after a procedure
+        is defined or redefined.
+        """
+        self.memo.clear()
+        self.pure_procedures = {}
+
     @property
     def stdout(self):
         if self.is_turtle_active():
@@ -114,14 +150,14 @@ class LogoInterpreter:
         """
         Wrap token list in TokenStream and `evaluate()`.
         """
-        stream = TokenStream.make_stream(lst)
+        stream = self.make_stream(lst)
         return self.evaluate(stream)
 
     def evaluate_readlist(self, data):
         """
         Evaluate input as READLIST.
         """
-        stream = TokenStream.make_stream(self.grammar(data).itemlist())
+        stream = self.make_stream(self.grammar(data).itemlist())
         return self.evaluate(stream)
 
     def process_instructionlist(self, script):
@@ -129,7 +165,22 @@ class LogoInterpreter:
         Process a script, which should represent a list of instructions
         when tokenized.
         """
-        stream = parse_tokens(self.grammar, script, debug=self.debug_tokens)
+        return self.run_instructions(self.compile_instructionlist(script))
+
+    def compile_instructionlist(self, script):
+        """
+        Tokenize a script once so `run_instructions` can run it many times.
+        """
+        token_lst = parse_token_list(self.grammar, script)
+        if self.debug_tokens:
+            print("PARSED TOKENS:", token_lst)
+        return token_lst
+
+    def run_instructions(self, token_lst):
+        """
+        Run tokens from `compile_instructionlist` and return the last value.
+        """
+        stream = self.make_stream(token_lst)
         result = None
         while len(stream) > 0:
             result = self.evaluate(stream)
@@ -159,7 +210,7 @@ class LogoInterpreter:
                     "Expected a command.  Instead, got `{}`.".format(token)
                 )
             if is_spcl_frm:
-                stream = TokenStream.make_stream(token)
+                stream = self.make_stream(token)
                 return self.process_special_form_or_expression(stream)
             else:
                 command = token.lower()
@@ -241,6 +292,12 @@ class LogoInterpreter:
         """
         self.placeholder_stack.append(placeholders)
 
+    def set_placeholders(self, placeholders):
+        """
+        Replace the placeholders on top of the stack.
+        """
+        self.placeholder_stack[-1] = placeholders
+
     def pop_placeholders(self):
         """
         Pop placeholders off of the stack.
@@ -255,10 +312,11 @@ class LogoInterpreter:
 
     def evaluate(self, tokens):
         """
-        Evaluate and check for infix.
+        Evaluate and check for infix.  Arrays take part in infix arithmetic
+        like numbers, element-wise.
         """
         value = self.evaluate_value(tokens)
-        if isinstance(value, numbers.Number):
+        if isinstance(value, (numbers.Number, LogoArray)):
             terms = [value]
             while True:
                 peek = tokens.peek()
@@ -321,14 +379,17 @@ class LogoInterpreter:
         token = tokens.peek()
         if token is None:
             raise errors.LogoError("Expected a value but instead got EOF.")
+        if isinstance(token, Expression):
+            tokens.popleft()
+            return self.evaluate_expression(token)
         if is_list(token):
-            lst_tokens = TokenStream.make_stream(tokens.popleft())
+            lst_tokens = self.make_stream(tokens.popleft())
             return self.evaluate_list(lst_tokens)
         if is_special_form(token):
-            spcl_frm_tokens = TokenStream.make_stream(tokens.popleft())
+            spcl_frm_tokens = self.make_stream(tokens.popleft())
             return self.process_special_form_or_expression(spcl_frm_tokens)
         if is_paren_expr(token):
-            expr_tokens = TokenStream.make_stream(tokens.popleft())
+            expr_tokens = self.make_stream(tokens.popleft())
             return self.evaluate(expr_tokens)
         if isinstance(token, numbers.Number):
             num = tokens.popleft()
@@ -369,13 +430,76 @@ class LogoInterpreter:
     def execute_procedure(self, proc, args):
         """
         Execute a procedure with args, `args`.
+        Calls to pure user procedures are answered from `memo` when the
+        same arguments have been seen before.
         """
         if proc.primitive_func:
             return proc.primitive_func(self, *args)
-        tokens = TokenStream.make_stream(proc.tokens)
-        scope = {}
+        if self.memo.size > 0 and purity.is_pure(self, proc):
+            key = purity.memo_key(proc, args)
+            if key is not None:
+                result, found = self.memo.get(key)
+                if not found:
+                    result = self.run_procedure(proc, args)
+                    self.memo.put(key, result)
+                return result
+        return self.run_procedure(proc, args)
+
+    def run_procedure(self, proc, args):
+        """
+        Run the body of user procedure `proc` with args, `args`.
+        A self-call at the end of the body runs in a loop here instead of
+        a nested call, so tail recursion does not deepen the Python stack.
+        """
+        if self.call_depth >= self.max_depth:
+            raise errors.LogoError(
+                "`{}` is nested more than {} procedure calls deep.".format(
+                    proc.name, self.max_depth
+                )
+            )
+        scope_stack = self.scope_stack
+        tail_call = False
+        self.call_depth += 1
+        try:
+            while True:
+                scope = {}
+                scope_stack.append(scope)
+                self.bind_inputs(proc, args, scope)
+                tokens = self.make_stream(proc.tokens)
+                result = None
+                args = None
+                try:
+                    args = self.process_procedure_body(proc, tokens)
+                except errors.StopSignal:
+                    result = None
+                except errors.OutputSignal as output:
+                    # The output of a tail call is discarded by its caller.
+                    if not tail_call:
+                        result = output.value
+                scope_stack.pop()
+                if args is None:
+                    return result
+                tail_call = True
+                self.note_tail_call(proc)
+        finally:
+            self.call_depth -= 1
+
+    def evaluate_expression(self, expression):
+        """
+        Evaluate a compiled infix `Expression` node.
+        """
+        return expression.evaluate(self)
+
+    def note_tail_call(self, proc):
+        """
+        Called each time `run_procedure` loops for a tail call to `proc`.
+        """
+
+    def bind_inputs(self, proc, args, scope):
+        """
+        Bind `args` to the inputs of `proc` in `scope`.
+        """
         scope_stack = self.scope_stack
-        scope_stack.append(scope)
         formal_params = list(
             itertools.chain(
                 [(name, None) for name in proc.required_inputs], proc.optional_inputs
@@ -416,15 +540,47 @@ class LogoInterpreter:
                 scope[varname] = value
         if rest_input:
             scope[rest_input] = rest_args
-        result = None
-        try:
+
+    def process_procedure_body(self, proc, tokens):
+        """
+        Run the body of a user procedure.
+        If the body ends with a call to the procedure itself, the arguments
+        of that call are returned instead of making it.  Otherwise returns
+        None.
+        """
+        if not proc.tail_call_safe:
             self.process_commands(tokens)
-        except errors.StopSignal:
-            result = None
-        except errors.OutputSignal as output:
-            result = output.value
-        scope_stack.pop()
-        return result
+            return None
+        name = proc.name.lower()
+        procedures = self.procedures
+        while len(tokens) > 0:
+            token = tokens.peek()
+            if (
+                isinstance(token, str)
+                and token.lower() == name
+                and procedures.get(name) is proc
+                and name not in self.primitives
+            ):
+                if self.halt:
+                    raise errors.HaltSignal("Received HALT")
+                tokens.popleft()
+                args = self.evaluate_args_for_command(proc.default_arity, tokens)
+                for n, arg in enumerate(args):
+                    if arg is None:
+                        raise errors.LogoError(
+                            "Procedure `{}` received a null value for argument {}.".format(
+                                name.upper(), n + 1
+                            )
+                        )
+                if self.debug_procs:
+                    print("PROCEDURE:", name, "ARGS:", args)
+                if len(tokens) == 0:
+                    return args
+                self.execute_procedure(proc, args)
+            else:
+                self.process_command(tokens)
+            self.process_events()
+        return None
 
     def process_special_form_or_expression(self, tokens):
         """
@@ -635,6 +791,10 @@ def transform_tokens(tokens):
     tmp = []
     for item in tokens:
         if isinstance(item, DelayedValue):
+            expression = compile_expression(item)
+            if expression is not None:
+                tmp.append(expression)
+                continue
             tmp.append(item.op)
             tmp.extend(transform_tokens([item.left]))
             tmp.extend(transform_tokens([item.right]))
@@ -649,14 +809,22 @@ def transform_tokens(tokens):
     return tmp
 
 
-def parse_tokens(grammar, script, debug=False):
+def parse_token_list(grammar, script):
     """
     Parse a Logo script.
-    Return a list of tokens.
+    Return the tokens as a list.
     """
     token_lst = grammar(script).itemlist()
-    token_lst = transform_tokens(token_lst)
-    tokens = TokenStream.make_stream(token_lst)
+    return fold_constants(transform_tokens(token_lst))
+
+
+def parse_tokens(grammar, script, debug=False, make_stream=TokenStream.make_stream):
+    """
+    Parse a Logo script.
+    Return a list of tokens.
+    """
+    token_lst = parse_token_list(grammar, script)
+    tokens = make_stream(token_lst)
     if debug:
         print("PARSED TOKENS:", tokens)
     return tokens
@@ -707,167 +875,4 @@ def is_command(token):
 
 
 def is_list(token):
-    return isinstance(token, list)
-
-
-# def main(args):
-#     """
-#     Parse Logo
-#     """
-#     grammar = make_token_grammar()
-#     interpreter = LogoInterpreter.create_interpreter()
-#     interpreter.turtle_backend_args = dict(input_handler=interpreter.receive_input)
-#     if args.turtle == "tk":
-#         interpreter.turtle_backend_args["maximize"] = args.maximize
-#         interpreter.init_turtle_graphics()
-#     interpreter.debug_tokens = args.debug_tokens
-#     interpreter.grammar = grammar
-#     interpreter.debug_primitives = args.debug_primitives
-#     interpreter.debug_procs = args.debug_procs
-#     script_folders = args.script_folder
-#     if script_folders is None:
-#         script_folders = []
-#     interpreter.script_folders = script_folders
-#     if args.turtle == "svg":
-#         interpreter.turtle_backend = svgturtle.SVGTurtleEnv.create_turtle_env()
-#         svg_args = dict(
-#             output_file=args.outfile,
-#             html_folder=args.html,
-#         )
-#         html_args = {}
-#         d = vars(args)
-#         for k in ("html_title", "animation_duration", "animation_type"):
-#             v = d.get(k)
-#             if v is not None:
-#                 html_args[k] = v
-#         if args.html_width:
-#             html_args["html_width"] = args.html_width
-#         if args.html_scale:
-#             html_args["html_scale"] = args.html_scale
-#         if args.animation_duration:
-#             html_args["animation_duration"] = args.animation_duration
-#         if args.animation_type:
-#             animation_type = args.animation_type
-#             if animation_type == "onebyone":
-#                 animation_type = "oneByOne"
-#             html_args["animation_type"] = animation_type
-#         if args.animation_start:
-#             animation_start = args.animation_start
-#             html_args["animation_start"] = animation_start
-#         svg_args["html_args"] = html_args
-#         interpreter.turtle_backend_args = svg_args
-#     if args.file is not None:
-#         script = args.file.read()
-#         tokens = parse_tokens(grammar, script, debug=args.debug_tokens)
-#         if args.tokenize_only:
-#             return
-#         try:
-#             result = interpreter.process_commands(tokens)
-#         except Exception as ex:
-#             print("Processed tokens: {}".format(tokens.processed), file=sys.stderr)
-#             raise ex
-#         if result is not None:
-#             raise errors.LogoError("You don't say what to do with `{}`.".format(result))
-#     if interpreter.is_turtle_active():
-#         interpreter.turtle_backend.wait_complete()
-#     if args.debug_interpreter:
-#         print("")
-#         import pprint
-
-#         pprint.pprint(interpreter)
-
-
-# if __name__ == "__main__":
-#     parser = argparse.ArgumentParser(
-#         description="Logo programming language interpreter"
-#     )
-#     parser.add_argument(
-#         "-f",
-#         "--file",
-#         type=argparse.FileType("r"),
-#         help="Logo script file to interpret.",
-#     )
-#     parser.add_argument(
-#         "-s",
-#         "--script-folder",
-#         action="append",
-#         help="Specify a folder from which the LOAD command will load Logo scripts.",
-#     )
-#     parser.add_argument("--debug-procs", action="store_true", help="Debug procedures.")
-#     parser.add_argument(
-#         "--debug-primitives", action="store_true", help="Debug procedures."
-#     )
-#     parser.add_argument(
-#         "--debug-tokens", action="store_true", help="Debug parsed tokens."
-#     )
-#     parser.add_argument(
-#         "--debug-interpreter",
-#         action="store_true",
-#         help="Dump interpreter state after script completes.",
-#     )
-#     parser.add_argument(
-#         "--tokenize-only",
-#         action="store_true",
-#         help="Only tokenize input.  Don't interpret.",
-#     )
-#     parser.set_defaults(turtle=None)
-#     subparsers = parser.add_subparsers(help="Turtle back ends.")
-#     parser_tk = subparsers.add_parser("gui", help="GUI mode")
-#     parser_tk.set_defaults(turtle="tk")
-#     parser_tk.add_argument(
-#         "--maximize", action="store_true", help="Maximize the window on startup."
-#     )
-#     parser_svg = subparsers.add_parser("svg", help="SVG turtle backend.")
-#     parser_svg.set_defaults(turtle="svg")
-#     parser_svg.add_argument(
-#         "-o",
-#         "--outfile",
-#         type=argparse.FileType("w"),
-#         metavar="OUTFILE",
-#         action="store",
-#         help="Save turtle graphics to SVG file, OUTFILE.",
-#     )
-#     parser_svg.add_argument(
-#         "--html",
-#         metavar="FOLDER",
-#         action="store",
-#         help="Save turtle graphics to folder, FOLDER, and create resources for web display.",
-#     )
-#     parser_svg.add_argument(
-#         "--html-title", action="store", help="Set HTML title for web resources."
-#     )
-#     parser_svg.add_argument(
-#         "--html-width",
-#         action="store",
-#         type=int,
-#         help="Set width of image in pixels for web resources.",
-#     )
-#     parser_svg.add_argument(
-#         "--html-scale",
-#         action="store",
-#         type=float,
-#         metavar="PERCENT",
-#         help="Scale width of image in web resource to PERCENT of display width.",
-#     )
-#     parser_svg.add_argument(
-#         "--animation-duration",
-#         action="store",
-#         type=int,
-#         help="Set animation duration (in frames) for web resources.",
-#     )
-#     parser_svg.add_argument(
-#         "--animation-type",
-#         action="store",
-#         choices=["sync", "delayed", "onebyone"],
-#         default="sync",
-#         help="Set animation type for web resources.",
-#     )
-#     parser_svg.add_argument(
-#         "--animation-start",
-#         action="store",
-#         choices=["inviewport", "automatic"],
-#         default="automatic",
-#         help="Set animation type for web resources.",
-#     )
-#     args = parser.parse_args()
-#     main(args)
+    return isinstance(token, LIST_TYPES)
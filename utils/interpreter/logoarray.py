@@ -0,0 +1,260 @@
+"""
+Numeric Logo lists with element-wise arithmetic.
+
+VECTOR turns a list of numbers into a `LogoArray`.  SUM, DIFFERENCE,
+PRODUCT, QUOTIENT, POWER, SIN, COS and SQRT work element-wise when an
+input is an array, in one NumPy call when NumPy is installed and in a
+Python loop otherwise.  Integer arithmetic that could overflow NumPy's
+64-bit integers also runs in Python, so results stay exact.  Everywhere
+else an array reads as an ordinary list of numbers.
+"""
+
+import collections.abc
+import functools
+import math
+import numbers
+import operator
+
+from . import errors
+
+# NumPy is slow to import, so it is loaded the first time VECTOR is used.
+_numpy_module = False
+# Bound on the integers NumPy's int64 arithmetic handles exactly.
+INT64_LIMIT = 2**63
+
+
+class LogoArray(collections.abc.Sequence):
+    """
+    Immutable list of numbers backed by a NumPy array, or by a Python list
+    when NumPy is not installed or the numbers don't fit its types.
+    """
+
+    __slots__ = ("values",)
+    __hash__ = None
+
+    def __init__(self, values):
+        self.values = values
+
+    @classmethod
+    def from_numbers(cls, items, cmd="VECTOR"):
+        """
+        Return `items` as a `LogoArray`, without copying if it already is one.
+        """
+        if isinstance(items, LogoArray):
+            return items
+        items = list(items)
+        for item in items:
+            if not _is_number(item):
+                raise errors.LogoError(
+                    "{} expected a list of numbers, but it contains `{}`.".format(
+                        cmd, item
+                    )
+                )
+        numpy = _numpy()
+        if numpy is None:
+            return cls(items)
+        values = numpy.asarray(items)
+        if values.dtype.kind not in "if":
+            # Integers too large for int64 stay exact as Python numbers.
+            return cls(items)
+        return cls(values)
+
+    def butfirst(self):
+        return LogoArray(self.values[1:])
+
+    def butlast(self):
+        return LogoArray(self.values[:-1])
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LogoArray(self.values[index])
+        value = self.values[index]
+        if isinstance(self.values, list):
+            return value
+        return value.item()
+
+    def __iter__(self):
+        if isinstance(self.values, list):
+            return iter(self.values)
+        return iter(self.values.tolist())
+
+    def __eq__(self, other):
+        if isinstance(other, collections.abc.Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    # Infix arithmetic in instruction lists goes through these.
+    def __add__(self, other):
+        return elementwise("sum", self, other)
+
+    def __radd__(self, other):
+        return elementwise("sum", other, self)
+
+    def __sub__(self, other):
+        return elementwise("difference", self, other)
+
+    def __rsub__(self, other):
+        return elementwise("difference", other, self)
+
+    def __mul__(self, other):
+        return elementwise("product", self, other)
+
+    def __rmul__(self, other):
+        return elementwise("product", other, self)
+
+    def __truediv__(self, other):
+        return elementwise("quotient", self, other)
+
+    def __rtruediv__(self, other):
+        return elementwise("quotient", other, self)
+
+    def __neg__(self):
+        return elementwise("product", self, -1)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    __str__ = __repr__
+
+
+def _degrees_sin(x):
+    return math.sin((x * math.pi) / 180.0)
+
+
+def _degrees_cos(x):
+    return math.cos((x * math.pi) / 180.0)
+
+
+# Name: (arity, NumPy function, Python function).
+OPERATIONS = {
+    "sum": (2, "add", operator.add),
+    "difference": (2, "subtract", operator.sub),
+    "product": (2, "multiply", operator.mul),
+    "quotient": (2, "true_divide", operator.truediv),
+    "power": (2, "power", math.pow),
+    "sin": (1, "sin", _degrees_sin),
+    "cos": (1, "cos", _degrees_cos),
+    "sqrt": (1, "sqrt", math.sqrt),
+}
+
+
+def elementwise(name, *args):
+    """
+    Apply the arithmetic primitive `name` element-wise.  Inputs may be
+    numbers, arrays or lists of numbers; arrays must be the same length.
+    SUM and PRODUCT take any number of inputs.
+    """
+    arity = OPERATIONS[name][0]
+    cmd = name.upper()
+    operands = [_operand(cmd, arg) for arg in args]
+    lengths = set(len(op) for op in operands if not _is_number(op))
+    if len(lengths) > 1:
+        raise errors.LogoError(
+            "{} expected arrays of the same length, but received {}.".format(
+                cmd, ", ".join(str(n) for n in sorted(lengths))
+            )
+        )
+    if arity == 1:
+        (value,) = operands
+        result = _apply(cmd, name, value)
+    else:
+        result = functools.reduce(
+            lambda left, right: _apply(cmd, name, left, right), operands
+        )
+    if _is_number(result):
+        return result
+    return LogoArray(result)
+
+
+def _operand(cmd, arg):
+    if _is_number(arg):
+        return arg
+    if isinstance(arg, collections.abc.Sequence) and not isinstance(arg, str):
+        return LogoArray.from_numbers(arg, cmd=cmd).values
+    raise errors.LogoError("{} expected a number but got `{}` instead.".format(cmd, arg))
+
+
+def _apply(cmd, name, *operands):
+    _, numpy_name, python_func = OPERATIONS[name]
+    numpy = _numpy()
+    if numpy is None or not _numpy_exact(numpy, name, operands):
+        operands = [op.tolist() if _is_array(op) else op for op in operands]
+        return _apply_python(cmd, python_func, operands)
+    if name in ("sin", "cos"):
+        operands = (numpy.radians(operands[0]),)
+    elif name == "power":
+        operands = (numpy.asarray(operands[0], dtype=float), operands[1])
+    with numpy.errstate(divide="raise", invalid="raise"):
+        try:
+            return getattr(numpy, numpy_name)(*operands)
+        except FloatingPointError:
+            raise _domain_error(cmd)
+
+
+def _numpy_exact(numpy, name, operands):
+    """
+    True if NumPy can apply `name` to `operands` with the same result as
+    Python: at least one is an array, none is a plain list, and integer
+    sums and products can't overflow.
+    """
+    if not any(_is_array(op) for op in operands):
+        return False
+    if not all(_is_array(op) or _is_number(op) for op in operands):
+        return False
+    if name not in ("sum", "difference", "product"):
+        return True
+    bounds = []
+    for op in operands:
+        if _is_array(op):
+            if op.dtype.kind != "i":
+                return True
+            bounds.append(max(int(op.max()), -int(op.min())) if op.size else 0)
+        elif isinstance(op, numbers.Integral):
+            bounds.append(abs(op))
+        else:
+            return True
+    if name == "product":
+        return functools.reduce(operator.mul, bounds) < INT64_LIMIT
+    return sum(bounds) < INT64_LIMIT
+
+
+def _numpy():
+    """
+    The NumPy module, or None if it is not installed.
+    """
+    global _numpy_module
+    if _numpy_module is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_module = numpy
+    return _numpy_module
+
+
+def _is_array(value):
+    return hasattr(value, "dtype")
+
+
+def _apply_python(cmd, func, operands):
+    try:
+        if all(_is_number(op) for op in operands):
+            return func(*operands)
+        size = max(len(op) for op in operands if not _is_number(op))
+        columns = zip(*[[op] * size if _is_number(op) else op for op in operands])
+        return [func(*column) for column in columns]
+    except (ValueError, ZeroDivisionError):
+        raise _domain_error(cmd)
+
+
+def _domain_error(cmd):
+    if cmd == "QUOTIENT":
+        return errors.LogoError("QUOTIENT can't divide by zero.")
+    return errors.LogoError("{} received a number outside its domain.".format(cmd))
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
@@ -0,0 +1,167 @@
+"""
+Persistent Logo lists.
+
+A `LogoList` is an immutable view of a shared Python list that holds the
+items in reverse order, so the first item of the Logo list is the last
+item of the storage.  FPUT appends to the storage and BUTFIRST or BUTLAST
+narrow the view, so both are O(1) and share structure with their input.
+Only the view that ends at the top of the storage may append to it; any
+other FPUT copies first, so a list never sees items added by another.
+
+A `LogoRange` is the lazy list returned by ISEQ and RSEQ.  It computes
+items from their index, so counting, indexing, BUTFIRST and iterating a
+range of any size take constant memory.  FPUT, PUSH and the like turn
+it into a `LogoList` first.
+"""
+
+import collections.abc
+
+from .logoarray import LogoArray
+
+
+class LogoList(collections.abc.Sequence):
+    """
+    Immutable Logo list with O(1) FPUT, BUTFIRST, BUTLAST, FIRST and LAST.
+    """
+
+    __slots__ = ("_items", "_lo", "_hi")
+    __hash__ = None
+
+    def __init__(self, items=()):
+        storage = list(items)
+        storage.reverse()
+        self._items = storage
+        self._lo = 0
+        self._hi = len(storage)
+
+    @classmethod
+    def _view(cls, storage, lo, hi):
+        view = object.__new__(cls)
+        view._items = storage
+        view._lo = lo
+        view._hi = hi
+        return view
+
+    @classmethod
+    def from_list(cls, lst):
+        """
+        Return `lst` as a `LogoList`, without copying if it already is one.
+        """
+        if isinstance(lst, LogoList):
+            return lst
+        return cls(lst)
+
+    def fput(self, thing):
+        items = self._items
+        if self._hi != len(items):
+            items = items[self._lo : self._hi]
+            items.append(thing)
+            return self._view(items, 0, len(items))
+        items.append(thing)
+        return self._view(items, self._lo, self._hi + 1)
+
+    def butfirst(self):
+        return self._view(self._items, self._lo, self._hi - 1)
+
+    def butlast(self):
+        return self._view(self._items, self._lo + 1, self._hi)
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def __getitem__(self, index):
+        size = self._hi - self._lo
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                return list(self)[index]
+            stop = max(start, stop)
+            return self._view(self._items, self._hi - stop, self._hi - start)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError("list index out of range")
+        return self._items[self._hi - 1 - index]
+
+    def __iter__(self):
+        return reversed(self._items[self._lo : self._hi])
+
+    def __reversed__(self):
+        return iter(self._items[self._lo : self._hi])
+
+    def __eq__(self, other):
+        if isinstance(other, LIST_TYPES):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    __str__ = __repr__
+
+
+class LogoRange(collections.abc.Sequence):
+    """
+    Lazy Logo list of `func(i)` for each `i` in the Python range `indices`,
+    or of the indices themselves if `func` is None.
+    """
+
+    __slots__ = ("indices", "func")
+    __hash__ = None
+
+    def __init__(self, indices, func=None):
+        self.indices = indices
+        self.func = func
+
+    def butfirst(self):
+        return LogoRange(self.indices[1:], self.func)
+
+    def butlast(self):
+        return LogoRange(self.indices[:-1], self.func)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LogoRange(self.indices[index], self.func)
+        i = self.indices[index]
+        if self.func is None:
+            return i
+        return self.func(i)
+
+    def __iter__(self):
+        if self.func is None:
+            return iter(self.indices)
+        return map(self.func, self.indices)
+
+    def __contains__(self, value):
+        if self.func is None:
+            return value in self.indices
+        return any(value == item for item in self)
+
+    def __eq__(self, other):
+        if isinstance(other, LIST_TYPES):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    __str__ = __repr__
+
+
+# Types that Logo treats as lists.
+LIST_TYPES = (list, LogoList, LogoRange, LogoArray)
@@ -5,7 +5,7 @@ import uuid
 import attr
 
 from . import errors
-from .trig import calc_distance, deg2rad, rotate_coords
+from .trig import arc_end, calc_distance, deg2rad, rotate_coords
 
 
 class FakeValidator:
@@ -128,6 +128,14 @@ class LogTurtleScreen:
         screen = cls()
         return screen
 
+    def reset(self):
+        """
+        Restore the default screen settings.
+        """
+        self._mode = None
+        self._colormode = None
+        self._bgcolor = "black"
+
     def mode(self, mode=None):
         if mode is None:
             return self._mode
@@ -197,27 +205,35 @@ class LogTurtle:
         turtle.screen = screen
         return turtle
 
+    def reset(self):
+        """
+        Return the turtle to its initial pose and pen, with an empty history.
+        New containers are assigned so a history already handed out is kept.
+        """
+        self._pendown = False
+        self._pencolor = "white"
+        self._pensize = 1
+        self._fillcolor = "white"
+        self._pos = (0, 0)
+        self._heading = self.home_heading
+        self._visible = True
+        self._speed = 5
+        self._components = []
+        self._bounds = (0, 0, 0, 0)
+        self._current_polyline = None
+        self._history = []
+        self._fill_mode = "off"
+        self._filled_components = None
+        self._hole_components = None
+        self._complete_hole_components = None
+
     def write_svg(self, fout):
         """
-        Write SVG output to file object `fout`.
+        Write SVG output to file object `fout`, streamed from the history.
         """
-        drawing = self.screen.drawing
-        g = self.screen.drawing.g()
-        g["transform"] = "matrix(0 1 1 0 0 0) rotate(90)"
-        drawing.add(g)
-        xmin, xmax, ymin, ymax = self._bounds
-        w = xmax - xmin
-        h = ymax - ymin
-        vb = "{} {} {} {}".format(xmin, ymin, w, h)
-        drawing["width"] = "100%"
-        drawing["height"] = "100%"
-        drawing["viewBox"] = vb
-        components = self._components
-        for component in components:
-            if hasattr(component, "points") and len(component.points) == 0:
-                continue
-            g.add(component)
-        drawing.write(fout)
+        from ..plotter.svg import write_svg
+
+        write_svg(self._history, fout)
 
     def get_bounds(self):
         """
@@ -282,26 +298,6 @@ class LogTurtle:
 
         self._pos = (x1, y1)
 
-    def _get_current_polyline(self):
-        """
-        Get the current polyline or create a new one if it doesn't exist.
-        """
-        polyline = self._current_polyline
-        if polyline is None:
-            polyline = self.screen.drawing.polyline()
-            polyline["stroke"] = self._pencolor
-            polyline["stroke-width"] = self._pensize
-            polyline["stroke-linecap"] = "square"
-            polyline["class"] = "hole"
-            polyline["fill-opacity"] = 0
-            x, y = self._pos
-            polyline.points.append((x, y))
-            polyline["class"] = "no-fill"
-            polyline["fill-opacity"] = 0
-            self._components.append(polyline)
-            self._current_polyline = polyline
-        return polyline
-
     def _adjust_bounds(self, x, y):
         """
         Adjust the bounds of the drawing.
@@ -365,6 +361,24 @@ class LogTurtle:
         self._pos = (x, y)
         self._history.append(("bk", dist))
 
+    def wait(self, ticks):
+        self._history.append(("wait", ticks))
+
+    def arc(self, radius, sweep, direction="lt"):
+        """
+        Drive along a circle of `radius`, turning `sweep` degrees towards
+        `direction` ("lt" or "rt"), and record it as one `arc` command.
+        The center is `radius` units to that side of the turtle.
+        """
+        x, y = self._pos
+        center, self._pos, self._heading = arc_end(
+            x, y, self._heading, radius, sweep, direction
+        )
+        xcenter, ycenter = center
+        self._adjust_bounds(xcenter - radius, ycenter - radius)
+        self._adjust_bounds(xcenter + radius, ycenter + radius)
+        self._history.append(("arc", radius, sweep, direction))
+
     def clear(self):
         self.components = []
         self._pos = (0, 0)
@@ -376,6 +390,7 @@ class LogTurtle:
 
     def pencolor(self, *args):
         arg_count = len(args)
+        previous = self._pencolor
         if arg_count == 0:
             return self._pencolor
         elif arg_count == 1:
@@ -388,11 +403,16 @@ class LogTurtle:
         else:
             raise Exception("Invalid color specification `{}`.".format(tuple(*args)))
         self._current_polyline = None
+        if self._pencolor != previous:
+            # Pen changes are kept for previews; the device never sees them.
+            self._history.append(("pencolor", self._pencolor))
 
     def pensize(self, width=None):
         if width is None:
             return self._pensize
         else:
+            if width != self._pensize:
+                self._history.append(("pensize", width))
             self._pensize = width
             self._current_polyline = None
 
@@ -548,9 +568,6 @@ class LogTurtle:
             self._line_to(x, y, no_stroke=no_stroke)
             if abs(angle_offset) >= angle:
                 break
-        if angle == 360:
-            polyline = self._get_current_polyline()
-            polyline["stroke-linecap"] = "round"
 
     def circle_arc_(self, radius, angle, theta, xcenter, ycenter):
         """
@@ -0,0 +1,95 @@
+import collections
+import contextlib
+import threading
+import time
+
+
+class InterpreterPool:
+    """
+    Bounded pool of ready-to-use interpreters.
+
+    `acquire()` hands out the most recently returned interpreter, creating a
+    new one with `factory` while fewer than `max_size` exist, and otherwise
+    waits for one to be released.  `release()` resets the interpreter and
+    keeps it; interpreters idle for longer than `idle_timeout` seconds are
+    dropped, down to `min_idle`.
+    """
+
+    def __init__(self, factory, max_size=4, min_idle=1, idle_timeout=60.0):
+        self.factory = factory
+        self.max_size = max_size
+        self.min_idle = min_idle
+        self.idle_timeout = idle_timeout
+        self._idle = collections.deque()
+        self._size = 0
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()[1]
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                self._cond.wait()
+        try:
+            return self.factory()
+        except BaseException:
+            self._discard()
+            raise
+
+    def release(self, interpreter):
+        try:
+            interpreter.reset()
+        except Exception:
+            self._discard()
+            raise
+        now = time.monotonic()
+        with self._cond:
+            self._idle.append((now, interpreter))
+            self._shrink(now)
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def interpreter(self):
+        """
+        Check an interpreter out for the duration of a `with` block.
+        """
+        interpreter = self.acquire()
+        try:
+            yield interpreter
+        finally:
+            self.release(interpreter)
+
+    def prefill(self, count=None):
+        """
+        Create interpreters ahead of the first requests.
+        """
+        count = self.min_idle if count is None else min(count, self.max_size)
+        interpreters = []
+        with self._cond:
+            count = max(0, min(count - len(self._idle), self.max_size - self._size))
+        for _ in range(count):
+            interpreters.append(self.acquire())
+        for interpreter in interpreters:
+            self.release(interpreter)
+
+    def _discard(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _shrink(self, now):
+        idle = self._idle
+        while len(idle) > self.min_idle and now - idle[0][0] > self.idle_timeout:
+            idle.popleft()
+            self._size -= 1
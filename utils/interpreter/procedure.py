@@ -1,17 +1,18 @@
 import collections
-import datetime
 import functools
 import math
 import numbers
 import operator
 import random
 import textwrap
-import time
 import traceback
+import types
 
 import attr
 
-from . import errors
+from . import errors, expression, logoarray
+from .logoarray import LogoArray
+from .logolist import LIST_TYPES, LogoList, LogoRange
 
 COLOR_MAP = {
     0: "black",
@@ -47,6 +48,7 @@ class LogoProcedure:
     tokens = attr.ib(default=None)
     primitive_func = attr.ib(default=None)
     _max_arity = attr.ib(default=None)
+    _tail_call_safe = attr.ib(default=None, repr=False)
 
     @classmethod
     def make_procedure(
@@ -123,6 +125,83 @@ class LogoProcedure:
         """
         return len(self.required_inputs)
 
+    @property
+    def tail_call_safe(self):
+        """
+        True if a self-call at the end of the body can reuse this call's
+        frame.  Logo scopes are dynamic, so a procedure that makes LOCAL
+        variables, or whose defaults read other variables, must keep its
+        frame visible to the call it makes.
+        """
+        if self._tail_call_safe is None:
+            safe = self.primitive_func is None
+            for name, value in self.optional_inputs:
+                if hasattr(value, "startswith") and value.startswith(":"):
+                    safe = False
+            if safe and _contains_word(self.tokens, ("local", "localmake")):
+                safe = False
+            self._tail_call_safe = safe
+        return self._tail_call_safe
+
+
+def _contains_word(tokens, words):
+    for token in tokens:
+        if isinstance(token, (list, tuple)):
+            if _contains_word(token, words):
+                return True
+        elif hasattr(token, "lower") and token.lower().lstrip('"') in words:
+            return True
+    return False
+
+
+@attr.s
+class CompiledTemplate:
+    """
+    A MAP, FILTER, FOREACH, etc. template compiled once per call.
+
+    Instruction lists are tokenized once, and the placeholder, REPCOUNT
+    and named-slot frames are pushed once in `__enter__`.  Calling the
+    template with a REPCOUNT and the slot values only rebinds those
+    frames and evaluates the tokens.
+    """
+
+    logo = attr.ib()
+    kind = attr.ib()
+    proc = attr.ib(default=None)
+    varnames = attr.ib(default=None)
+    tokens = attr.ib(default=None)
+    _scope_index = attr.ib(default=None, repr=False)
+
+    def __enter__(self):
+        logo = self.logo
+        logo.push_placeholders(())
+        logo.create_repcount_scope()
+        if self.kind == "lambda-form":
+            self._scope_index = len(logo.scope_stack)
+            logo.scope_stack.append({})
+        return self
+
+    def __exit__(self, *exc):
+        logo = self.logo
+        if self._scope_index is not None:
+            del logo.scope_stack[self._scope_index :]
+            self._scope_index = None
+        logo.destroy_repcount_scope()
+        logo.pop_placeholders()
+        return False
+
+    def __call__(self, repcount, values):
+        logo = self.logo
+        logo.set_placeholders(values)
+        logo.set_repcount(repcount)
+        kind = self.kind
+        if kind == "lambda-form":
+            logo.scope_stack[self._scope_index] = dict(zip(self.varnames, values))
+            return logo.run_instructions(self.tokens)
+        if kind == "qmark-form":
+            return logo.run_instructions(self.tokens)
+        return logo.execute_procedure(self.proc, list(values))
+
 
 def create_primitives_map():
     """
@@ -447,6 +526,9 @@ def create_primitives_map():
     m["uppercase"] = make_primitive(
         "uppercase", ["word"], [], None, 1, process_uppercase
     )
+    m["vector"] = make_primitive("vector", ["list"], [], None, 1, process_vector)
+    m["vectorp"] = make_primitive("vectorp", ["thing"], [], None, 1, process_vectorp)
+    m["vector?"] = m["vectorp"]
     m["wait"] = make_primitive("wait", ["time"], [], None, 1, process_wait)
     m["while"] = make_primitive(
         "while", ["tfexpr", "instrlist"], [], None, 2, process_while
@@ -508,25 +590,54 @@ def process_and(logo, *args):
 def process_arc(logo, angle, radius):
     """
     The turtle graphics ARC command.
+    The arc is centered on the turtle and starts `radius` units to its
+    right, or to its left if `radius` is negative.  It is recorded as a
+    single `arc` command, and the turtle drives back to where it started
+    with the pen up.
     """
     t0 = logo.turtle
     isdown = t0.isdown()
     pos = t0.pos()
     heading = t0.heading()
     t0.penup()
-    t0.right(90)
+    # A negative radius draws the arc facing the other way, so only
+    # positive radii are recorded.
+    if radius < 0:
+        radius = -radius
+        t0.left(90)
+    else:
+        t0.right(90)
     t0.forward(radius)
-    t0.left(90)
+    if angle >= 0:
+        t0.left(90)
+    else:
+        # Sweeping back past the start means driving the other way round.
+        t0.right(90)
     if isdown:
         t0.pendown()
-    t0.circle(radius, angle)
+    if angle != 0:
+        t0.arc(radius, abs(angle), "lt" if angle > 0 else "rt")
     t0.penup()
+    _turn_towards(t0, t0.towards(*pos))
+    t0.forward(radius)
+    _turn_towards(t0, heading)
     t0.setpos(*pos)
     t0.setheading(heading)
     if isdown:
         t0.pendown()
 
 
+def _turn_towards(turtle, target):
+    """
+    Turn `turtle` the short way round to the heading `target`.
+    """
+    angle = round((target - turtle.heading() + 180) % 360 - 180, 9)
+    if angle > 0:
+        turtle.left(angle)
+    elif angle < 0:
+        turtle.right(-angle)
+
+
 def process_arctan(logo, *args):
     """
     The ARCTAN command.
@@ -599,6 +710,10 @@ def process_butfirst(logo, wordlist):
     """
     if len(wordlist) == 0:
         raise errors.LogoError("BUTFIRST doesn't like `{}` as input.".format(wordlist))
+    if isinstance(wordlist, (LogoList, LogoRange, LogoArray)):
+        return wordlist.butfirst()
+    if _is_list(wordlist):
+        return LogoList(wordlist).butfirst()
     return wordlist[1:]
 
 
@@ -620,6 +735,10 @@ def process_butlast(logo, wordlist):
     """
     if len(wordlist) == 0:
         raise errors.LogoError("BUTLAST doesn't like `{}` as input.".format(wordlist))
+    if isinstance(wordlist, (LogoList, LogoRange, LogoArray)):
+        return wordlist.butlast()
+    if _is_list(wordlist):
+        return LogoList(wordlist).butlast()
     return wordlist[:-1]
 
 
@@ -658,16 +777,22 @@ def process_cascade(logo, endtest, *args):
             return count > repetitions
 
     elif dtype == "list":
-        endtest_script = _list_contents_repr(endtest, include_braces=False)
+        endtest_script = logo.compile_instructionlist(
+            _list_contents_repr(endtest, include_braces=False)
+        )
 
         def test_end_func(count, script):
-            return _is_true(logo.process_instructionlist(script))
+            return _is_true(logo.run_instructions(script))
 
     else:
         raise errors.LogoError(
             "CASCADE expected an integer or template for "
             "`endtest`, but received `{}` instead.".format(endtest)
         )
+    compiled = [
+        logo.compile_instructionlist(_list_contents_repr(template, include_braces=False))
+        for template in templates
+    ]
     results = list(startvalues)
     logo.create_repcount_scope()
     try:
@@ -679,9 +804,8 @@ def process_cascade(logo, endtest, *args):
             last_results = list(results)
             logo.push_placeholders(last_results)
             try:
-                for n, template in enumerate(templates):
-                    script = _list_contents_repr(template, include_braces=False)
-                    results[n] = logo.process_instructionlist(script)
+                for n, tokens in enumerate(compiled):
+                    results[n] = logo.run_instructions(tokens)
             finally:
                 logo.pop_placeholders()
         if final_template is None:
@@ -789,6 +913,8 @@ def process_cos(logo, degrees):
     """
     The COS command.
     """
+    if isinstance(degrees, LogoArray):
+        return logoarray.elementwise("cos", degrees)
     try:
         return math.cos((degrees * math.pi) / 180.0)
     except (TypeError, ValueError):
@@ -826,16 +952,17 @@ def process_dequeue(logo, queuename):
     The DEQUEUE command.
     """
     q = logo.get_variable_value(queuename)
-    try:
-        return q.pop()
-    except AttributeError:
+    if not _is_list(q):
         raise errors.LogoError(
             "Tried to DEQUEUE from `{}`, but is not a list.".format(queuename)
         )
-    except IndexError:
+    if len(q) == 0:
         raise errors.LogoError(
             "Tried to DEQUEUE from an empty list, `{}`.".format(queuename)
         )
+    q = LogoList.from_list(q)
+    process_make(logo, queuename, q.butlast())
+    return q[-1]
 
 
 def process_difference(logo, num1, num2):
@@ -844,6 +971,8 @@ def process_difference(logo, num1, num2):
     """
     for arg in (num1, num2):
         if not isinstance(arg, numbers.Number):
+            if _has_array((num1, num2)):
+                return logoarray.elementwise("difference", num1, num2)
             raise errors.LogoError(
                 "DIFFERENCE expected a number but got `{}` instead.".format(arg)
             )
@@ -948,36 +1077,17 @@ def process_filter(logo, tftemplate, data):
     """
     The FILTER command.
     """
-    template_type, template = _create_template("FILTER", logo, [data], tftemplate)
-    scope_stack = logo.scope_stack
+    template = _compile_template("FILTER", logo, [data], tftemplate)
     results = []
-    for n, item in enumerate(data):
-        result = None
-        logo.push_placeholders((item,))
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, [item]))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like("FILTER", logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like("FILTER", logo, template)
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, [item])
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, [item])
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
-        if _is_true(result):
-            results.append(item)
-        elif not _is_false(result):
-            raise errors.LogoError("FILTER template must return either true or false.")
+    with template:
+        for n, item in enumerate(data, 1):
+            result = template(n, (item,))
+            if _is_true(result):
+                results.append(item)
+            elif not _is_false(result):
+                raise errors.LogoError(
+                    "FILTER template must return either true or false."
+                )
     return results
 
 
@@ -999,37 +1109,20 @@ def process_find(logo, tftemplate, data):
     """
     The FIND command.
     """
-    template_type, template = _create_template("FIND", logo, [data], tftemplate)
-    scope_stack = logo.scope_stack
-    for n, item in enumerate(data):
-        result = None
-        logo.push_placeholders((item,))
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, [item]))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like("FIND", logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like("FIND", logo, template)
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, [item])
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, [item])
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
-        if result is None:
-            raise errors.LogoError("FILTER template must return either true or false.")
-        if _is_true(result):
-            return item
-        elif not _is_false(result):
-            raise errors.LogoError("FILTER template must return either true or false.")
+    template = _compile_template("FIND", logo, [data], tftemplate)
+    with template:
+        for n, item in enumerate(data, 1):
+            result = template(n, (item,))
+            if result is None:
+                raise errors.LogoError(
+                    "FILTER template must return either true or false."
+                )
+            if _is_true(result):
+                return item
+            elif not _is_false(result):
+                raise errors.LogoError(
+                    "FILTER template must return either true or false."
+                )
     return []
 
 
@@ -1202,6 +1295,23 @@ def _create_template(cmd, logo, data_lists, template):
             )
 
 
+def _compile_template(cmd, logo, data_lists, template):
+    """
+    Returns a `CompiledTemplate` for commands like FOREACH, MAP, etc.
+    """
+    kind, template = _create_template(cmd, logo, data_lists, template)
+    if kind == "lambda-form":
+        varnames, instructionlist = template
+        script = _list_contents_repr(instructionlist, include_braces=False)
+        return CompiledTemplate(
+            logo, kind, varnames=varnames, tokens=logo.compile_instructionlist(script)
+        )
+    if kind == "qmark-form":
+        script = _list_contents_repr(template, include_braces=False)
+        return CompiledTemplate(logo, kind, tokens=logo.compile_instructionlist(script))
+    return CompiledTemplate(logo, kind, proc=template)
+
+
 def process_foreach(logo, *args):
     """
     The FOREACH command.
@@ -1216,35 +1326,11 @@ def process_foreach(logo, *args):
     data_lists = args[:-1]
     if not len(set([len(x) for x in data_lists])) == 1:
         raise errors.LogoError("FOREACH expects all data lists to be of equal size.")
-    template_type, template = _create_template("FOREACH", logo, data_lists, template)
-    scope_stack = logo.scope_stack
+    template = _compile_template("FOREACH", logo, data_lists, template)
     result = None
-    for n, t in enumerate(zip(*data_lists)):
-        logo.push_placeholders(t)
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, t))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like("FOREACH", logo, template_instrlist)
-                    continue
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like("FOREACH", logo, template)
-                continue
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, *t)
-                continue
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, t)
-                continue
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
+    with template:
+        for n, t in enumerate(zip(*data_lists), 1):
+            result = template(n, t)
     return result
 
 
@@ -1302,9 +1388,11 @@ def process_fput(logo, thing, lst):
     """
     The FPUT command.
     """
-    lst = [thing]
-    lst.extend(lst)
-    return lst
+    if _is_list(lst):
+        return LogoList.from_list(lst).fput(thing)
+    if _is_word(lst):
+        return process_word(logo, thing, lst)
+    raise errors.LogoError("FPUT doesn't like `{}` as input.".format(lst))
 
 
 def process_greaterequalp(logo, num1, num2):
@@ -1458,7 +1546,7 @@ def process_iseq(logo, frm, to):
         stop = to - 1
         step = -1
     try:
-        return list(range(start, stop, step))
+        return LogoRange(range(start, stop, step))
     except TypeError:
         raise errors.LogoError(
             "ISEQ expects numbers, but received `{}`, `{}` instead.".format(frm, to)
@@ -1725,35 +1813,14 @@ def _process_map(cmd, logo, template, *data_lists):
         raise errors.LogoError(
             "{} expects all data lists to be of equal size.".format(cmd)
         )
-    template_type, template = _create_template("MAP", logo, data_lists, template)
-    scope_stack = logo.scope_stack
+    template = _compile_template("MAP", logo, data_lists, template)
     results = []
-    for n, t in enumerate(zip(*data_lists)):
-        result = None
-        logo.push_placeholders(t)
-        logo.create_repcount_scope()
-        logo.set_repcount(n + 1)
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, t))
-                scope_stack.append(scope)
-                try:
-                    result = _process_run_like(cmd, logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                result = _process_run_like(cmd, logo, template)
-            elif template_type == "named-procedure":
-                result = logo.execute_procedure(template, *t)
-            elif template_type == "procedure-text":
-                result = logo.execute_procedure(template, t)
-        finally:
-            logo.destroy_repcount_scope()
-            logo.pop_placeholders()
-        if result is None:
-            raise errors.LogoError("{} template must return a value.".format(cmd))
-        results.append(result)
+    with template:
+        for n, t in enumerate(zip(*data_lists), 1):
+            result = template(n, t)
+            if result is None:
+                raise errors.LogoError("{} template must return a value.".format(cmd))
+            results.append(result)
     return results
 
 
@@ -2032,14 +2099,15 @@ def process_pop(logo, stackname):
     The POP command.
     """
     stack = logo.get_variable_value(stackname)
-    try:
-        return stack.pop(0)
-    except AttributeError:
+    if not _is_list(stack):
         raise errors.LogoError(
             "Tried to POP from `{}`, but it is not a list.".format(stackname)
         )
-    except IndexError:
+    if len(stack) == 0:
         raise errors.LogoError("Tried to POP from empty stack, `{}`.".format(stackname))
+    stack = LogoList.from_list(stack)
+    process_make(logo, stackname, stack.butfirst())
+    return stack[0]
 
 
 def process_pos(logo):
@@ -2053,6 +2121,8 @@ def process_power(logo, num1, num2):
     """
     The POWER command.
     """
+    if _has_array((num1, num2)):
+        return logoarray.elementwise("power", num1, num2)
     try:
         return math.pow(num1, num2)
     except ValueError:
@@ -2082,6 +2152,8 @@ def process_product(logo, *args):
     """
     for arg in args:
         if not isinstance(arg, numbers.Number):
+            if _has_array(args):
+                return logoarray.elementwise("product", *args)
             raise errors.LogoError(
                 "PRODUCT expected a number but got `{}` instead.".format(arg)
             )
@@ -2093,12 +2165,11 @@ def process_push(logo, stackname, thing):
     The PUSH command.
     """
     stack = logo.get_variable_value(stackname)
-    try:
-        stack.insert(0, thing)
-    except AttributeError:
+    if not _is_list(stack):
         raise errors.LogoError(
             "Tried to PUSH to `{}`, but is not a list.".format(stackname)
         )
+    process_make(logo, stackname, LogoList.from_list(stack).fput(thing))
 
 
 def process_queue(logo, queuename, thing):
@@ -2106,12 +2177,11 @@ def process_queue(logo, queuename, thing):
     The QUEUE command.
     """
     q = logo.get_variable_value(queuename)
-    try:
-        q.insert(0, thing)
-    except AttributeError:
+    if not _is_list(q):
         raise errors.LogoError(
             "Tried to QUEUE to `{}`, but it is not a list.".format(queuename)
         )
+    process_make(logo, queuename, LogoList.from_list(q).fput(thing))
 
 
 def process_quoted(logo, thing):
@@ -2129,6 +2199,8 @@ def process_quotient(logo, num1, num2):
     """
     for arg in (num1, num2):
         if not isinstance(arg, numbers.Number):
+            if _has_array((num1, num2)):
+                return logoarray.elementwise("quotient", num1, num2)
             raise errors.LogoError(
                 "QUOTIENT expected a number but got `{}` instead.".format(arg)
             )
@@ -2245,29 +2317,11 @@ def process_reduce(logo, template, data):
     """
     if len(data) == 1:
         return data[0]
-    template_type, template = _create_template("REDUCE", logo, [data, data], template)
-    scope_stack = logo.scope_stack
+    template = _compile_template("REDUCE", logo, [data, data], template)
     accumulator = data[0]
-    data = data[1:]
-    for item in data:
-        logo.push_placeholders((item, accumulator))
-        try:
-            if template_type == "lambda-form":
-                varnames, template_instrlist = template
-                scope = dict(zip(varnames, [item, accumulator]))
-                scope_stack.append(scope)
-                try:
-                    accumulator = _process_run_like("REDUCE", logo, template_instrlist)
-                finally:
-                    scope_stack.pop()
-            elif template_type == "qmark-form":
-                accumulator = _process_run_like("FILTER", logo, template)
-            elif template_type == "named-procedure":
-                accumulator = logo.execute_procedure(template, [item, accumulator])
-            elif template_type == "procedure-text":
-                accumulator = logo.execute_procedure(template, [item, accumulator])
-        finally:
-            logo.pop_placeholders()
+    with template:
+        for n, item in enumerate(data[1:], 1):
+            accumulator = template(n, (item, accumulator))
     return accumulator
 
 
@@ -2380,7 +2434,11 @@ def process_rseq(logo, frm, to, count):
 
     p = functools.partial(pos_fn, frm, to, count)
     try:
-        return list(map(p, range(count)))
+        seq = LogoRange(range(count), p)
+        if count > 0:
+            # Report bad inputs now rather than when an item is first used.
+            seq[0]
+        return seq
     except TypeError:
         raise errors.LogoError(
             "RSEQ expected numbers, but got `{}`, `{}`, `{}` instead.".format(
@@ -2486,7 +2544,15 @@ def process_setpencolor(logo, color):
 def process_setpensize(logo, width):
     """
     The SETPENSIZE command.
+    Takes a width, or a list of `[width height]` as in UCBLogo, whose
+    width is used.
     """
+    if _is_list(width) and len(width) in (1, 2):
+        width = width[0]
+    if not _is_number(width) or width < 0:
+        raise errors.LogoError(
+            "SETPENSIZE expected a width but received `{}` instead.".format(width)
+        )
     logo.turtle.pensize(width)
 
 
@@ -2560,6 +2626,8 @@ def process_sin(logo, degrees):
     """
     The SIN command.
     """
+    if isinstance(degrees, LogoArray):
+        return logoarray.elementwise("sin", degrees)
     try:
         return math.sin((degrees * math.pi) / 180.0)
     except (TypeError, ValueError):
@@ -2572,6 +2640,8 @@ def process_sqrt(logo, num):
     """
     The SQRT command.
     """
+    if isinstance(num, LogoArray):
+        return logoarray.elementwise("sqrt", num)
     try:
         return math.sqrt(num)
     except TypeError:
@@ -2613,6 +2683,8 @@ def process_sum(logo, *args):
     """
     for arg in args:
         if not _is_number(arg):
+            if _has_array(args):
+                return logoarray.elementwise("sum", *args)
             raise errors.LogoError(
                 "SUM expected a number but got `{}` instead.".format(arg)
             )
@@ -2703,6 +2775,7 @@ def process_to(logo, tokens):
             tokens=procedure_tokens,
         )
         logo.procedures[procedure_name.lower()] = procedure
+        logo.forget_memo()
     finally:
         scope_stack.pop()
 
@@ -2782,28 +2855,40 @@ def process_uppercase(logo, word):
         )
 
 
+def process_vector(logo, lst):
+    """
+    The VECTOR command.
+    Converts a list of numbers to an array that SUM, PRODUCT, SIN, etc.
+    work on element-wise.
+    """
+    if not _is_list(lst):
+        raise errors.LogoError(
+            "VECTOR expects a list of numbers, but received `{}` instead.".format(lst)
+        )
+    return LogoArray.from_numbers(lst)
+
+
+def process_vectorp(logo, thing):
+    """
+    The VECTORP command.
+    """
+    if isinstance(thing, LogoArray):
+        return "true"
+    return "false"
+
+
 def process_wait(logo, t):
     """
     The WAIT command.
+    Records a pause of `t` sixtieths of a second in the turtle history.
+    The pause happens when the device plays the program back, not while
+    it is being interpreted.
     """
-    if not logo.is_turtle_active:
-        time.sleep(t / 60.0)
-    else:
-        refresh_secs = 0.1
-        t0 = datetime.datetime.now()
-        td = datetime.timedelta(seconds=t / 60.0)
-        t1 = t0 + td
-        while True:
-            logo.process_events()
-            t = datetime.datetime.now()
-            if t >= t1:
-                break
-            td = t1 - t
-            seconds = td.total_seconds()
-            if seconds >= refresh_secs:
-                time.sleep(refresh_secs)
-            else:
-                time.sleep(seconds)
+    if not _is_number(t) or t < 0:
+        raise errors.LogoError(
+            "WAIT expects a non-negative number, but received `{}` instead.".format(t)
+        )
+    logo.turtle.wait(t)
 
 
 def process_while(logo, tfexpr, instrlist):
@@ -2857,11 +2942,18 @@ def _datatypename(o):
     """
     if isinstance(o, str) or isinstance(o, numbers.Number):
         return "word"
-    if isinstance(o, list):
+    if isinstance(o, LIST_TYPES):
         return "list"
     return "unknown"
 
 
+def _has_array(args):
+    """
+    Returns True if any of `args` is a `LogoArray`.
+    """
+    return any(isinstance(arg, LogoArray) for arg in args)
+
+
 def _is_list(o):
     """
     Returns True if `o` is a Logo list.
@@ -2909,6 +3001,8 @@ def _list_contents_repr(o, include_braces=True, escape_delimiters=True):
     elif _is_expr_or_special_form(o):
         rep = "({})".format(_list_contents_repr(list(o), include_braces=False))
         return rep
+    elif isinstance(o, expression.Expression):
+        return str(o)
     else:
         raise errors.LogoError("Unknown data type for `{}`.".format(o))
 
@@ -2979,3 +3073,8 @@ def _get_color(cmdname, color):
     else:
         color = COLOR_MAP.get(color, color)
     return color
+
+
+# Built once and shared, read-only, by every interpreter.  User procedures
+# live in each interpreter's own `procedures` dict.
+PRIMITIVES = types.MappingProxyType(create_primitives_map())
@@ -0,0 +1,239 @@
+#! /usr/bin/env python
+
+import argparse
+import json
+import sys
+import time
+
+import attr
+
+from . import interpreter as logo_interpreter
+
+
+@attr.s
+class CallStats:
+    """
+    Timing for one primitive or procedure.
+    """
+
+    calls = attr.ib(default=0)
+    cumulative = attr.ib(default=0.0)
+    self_time = attr.ib(default=0.0)
+    max_depth = attr.ib(default=0)
+    active = attr.ib(default=0)
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "cumulative_seconds": self.cumulative,
+            "self_seconds": self.self_time,
+            "max_depth": self.max_depth,
+        }
+
+
+@attr.s
+class Profiler:
+    """
+    Per-primitive and per-procedure profiler for a `LogoInterpreter`.
+
+    `install()` replaces the interpreter's `execute_procedure`,
+    `evaluate_expression`, `note_tail_call` and `make_stream` with
+    instrumented versions on that instance only, so an
+    interpreter that is not being profiled runs the normal code paths.
+    """
+
+    primitives = attr.ib(default=attr.Factory(dict))
+    procedures = attr.ib(default=attr.Factory(dict))
+    streams = attr.ib(default=0)
+    max_depth = attr.ib(default=0)
+    elapsed = attr.ib(default=0.0)
+    _logo = attr.ib(default=None, repr=False)
+    _make_stream = attr.ib(default=None, repr=False)
+    _started = attr.ib(default=None, repr=False)
+
+    def install(self, logo):
+        """
+        Start profiling `logo`.
+        Compiled infix arithmetic is counted under its primitive, e.g.
+        `product`, and each tail call that `run_procedure` turns into a
+        loop counts as a call of its procedure.
+        """
+        execute_procedure = logo.execute_procedure
+        evaluate_expression = logo.evaluate_expression
+        make_stream = logo.make_stream
+        primitives = self.primitives
+        procedures = self.procedures
+        children = []
+        clock = time.perf_counter
+        depth = [0]
+
+        def timed(table, name, is_primitive, func, *args):
+            stats = table.get(name)
+            if stats is None:
+                stats = table[name] = CallStats()
+            stats.calls += 1
+            stats.active += 1
+            if stats.active > stats.max_depth:
+                stats.max_depth = stats.active
+            if not is_primitive:
+                depth[0] += 1
+                if depth[0] > self.max_depth:
+                    self.max_depth = depth[0]
+            children.append(0.0)
+            start = clock()
+            try:
+                return func(*args)
+            finally:
+                elapsed = clock() - start
+                stats.self_time += elapsed - children.pop()
+                if children:
+                    children[-1] += elapsed
+                stats.active -= 1
+                if stats.active == 0:
+                    stats.cumulative += elapsed
+                if not is_primitive:
+                    depth[0] -= 1
+
+        def profiled_execute_procedure(proc, args):
+            name = proc.name or "<anonymous>"
+            if proc.primitive_func is not None:
+                return timed(primitives, name, True, execute_procedure, proc, args)
+            return timed(procedures, name, False, execute_procedure, proc, args)
+
+        def profiled_evaluate_expression(expression):
+            return timed(primitives, expression.op, True, evaluate_expression, expression)
+
+        def profiled_note_tail_call(proc):
+            # The loop runs inside the first call, which already has the time.
+            stats = procedures.get(proc.name or "<anonymous>")
+            if stats is not None:
+                stats.calls += 1
+
+        def profiled_make_stream(lst):
+            self.streams += 1
+            return make_stream(lst)
+
+        self._logo = logo
+        self._make_stream = make_stream
+        self._started = clock()
+        logo.execute_procedure = profiled_execute_procedure
+        logo.evaluate_expression = profiled_evaluate_expression
+        logo.note_tail_call = profiled_note_tail_call
+        logo.make_stream = profiled_make_stream
+        return self
+
+    def uninstall(self):
+        """
+        Stop profiling and restore the interpreter.
+        """
+        logo = self._logo
+        if logo is None:
+            return
+        del logo.execute_procedure
+        del logo.evaluate_expression
+        del logo.note_tail_call
+        logo.make_stream = self._make_stream
+        self.elapsed += time.perf_counter() - self._started
+        self._logo = None
+        self._make_stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+        return False
+
+    def report(self):
+        """
+        Return the profile as a JSON-serializable dictionary.
+        """
+        if self._logo is not None:
+            elapsed = self.elapsed + time.perf_counter() - self._started
+        else:
+            elapsed = self.elapsed
+        return {
+            "elapsed_seconds": elapsed,
+            "max_depth": self.max_depth,
+            "streams": self.streams,
+            "primitives": _table(self.primitives),
+            "procedures": _table(self.procedures),
+        }
+
+
+def _table(stats):
+    items = sorted(stats.items(), key=lambda item: item[1].self_time, reverse=True)
+    return {name: s.as_dict() for name, s in items}
+
+
+def format_report(report, sort="self", limit=20):
+    """
+    Format a profile report as a text table.
+    """
+    key = {
+        "self": "self_seconds",
+        "cumulative": "cumulative_seconds",
+        "calls": "calls",
+    }[sort]
+    lines = [
+        "elapsed {:.6f}s  max depth {}  token streams {}".format(
+            report["elapsed_seconds"], report["max_depth"], report["streams"]
+        )
+    ]
+    for title in ("primitives", "procedures"):
+        rows = sorted(report[title].items(), key=lambda item: item[1][key], reverse=True)
+        if len(rows) == 0:
+            continue
+        lines.append("")
+        lines.append(
+            "{:<24} {:>10} {:>12} {:>12} {:>6}".format(
+                title.upper(), "calls", "cumulative", "self", "depth"
+            )
+        )
+        for name, s in rows[:limit]:
+            lines.append(
+                "{:<24} {:>10} {:>12.6f} {:>12.6f} {:>6}".format(
+                    name, s["calls"], s["cumulative_seconds"], s["self_seconds"], s["max_depth"]
+                )
+            )
+    return "\n".join(lines)
+
+
+def main(args):
+    """
+    Profile a Logo script.
+    """
+    grammar = logo_interpreter.make_token_grammar()
+    logo = logo_interpreter.LogoInterpreter.create_interpreter()
+    logo.grammar = grammar
+    script = args.file.read()
+    tokens = logo_interpreter.parse_tokens(grammar, script)
+    with Profiler().install(logo) as profiler:
+        logo.process_commands(tokens)
+    report = profiler.report()
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print("")
+    else:
+        print(format_report(report, sort=args.sort, limit=args.limit))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile a Logo script.")
+    parser.add_argument(
+        "file", type=argparse.FileType("r"), help="Logo script file to profile."
+    )
+    parser.add_argument(
+        "--sort",
+        choices=["self", "cumulative", "calls"],
+        default="self",
+        help="Column to sort by.",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=20, help="Rows to show per table."
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the report as JSON."
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,279 @@
+"""
+Purity analysis and memoization for user procedures.
+
+A procedure is pure when its OUTPUT depends only on its inputs and running
+it changes nothing outside its own call: it uses only the primitives in
+`PURE_PRIMITIVES`, calls only pure procedures, reads only its inputs and
+its own LOCAL variables, and outputs a value.  Calls to pure procedures
+are memoized per interpreter, keyed by procedure name and arguments.
+Calls with long lists are not: copying the list into the key would cost
+more than the call saves, and makes list recursion quadratic.
+"""
+
+import collections
+
+from .expression import Expression
+from .logoarray import LogoArray
+from .logolist import LIST_TYPES
+
+# Canonical primitive names (`LogoProcedure.name`); aliases resolve to these.
+PURE_PRIMITIVES = frozenset(
+    [
+        "and",
+        "arctan",
+        "beforep",
+        "butfirst",
+        "butlast",
+        "char",
+        "combine",
+        "cos",
+        "count",
+        "difference",
+        "emptyp",
+        "equalp",
+        "exp",
+        "first",
+        "float",
+        "fput",
+        "greaterequalp",
+        "greaterp",
+        "if",
+        "ifelse",
+        "int",
+        "iseq",
+        "item",
+        "last",
+        "lessequalp",
+        "lessp",
+        "list",
+        "listp",
+        "ln",
+        "local",
+        "localmake",
+        "log10",
+        "lowercase",
+        "lput",
+        "member",
+        "memberp",
+        "modulo",
+        "not",
+        "notequalp",
+        "numberp",
+        "or",
+        "output",
+        "power",
+        "product",
+        "quotient",
+        "radarctan",
+        "radcos",
+        "radsin",
+        "remainder",
+        "remdup",
+        "remove",
+        "reverse",
+        "round",
+        "rseq",
+        "sentence",
+        "sin",
+        "sqrt",
+        "stop",
+        "substringp",
+        "sum",
+        "unicode",
+        "uppercase",
+        "vector",
+        "vectorp",
+        "word",
+        "wordp",
+    ]
+)
+INFIX_OPERATORS = frozenset(["+", "-", "*", "/", "<", ">", "=", "<=", ">=", "<>"])
+LOCAL_PRIMITIVES = frozenset(["local", "localmake"])
+DEFAULT_MEMO_SIZE = 1024
+# Most list items, counted through nested lists, in a memoized call's
+# arguments or result.
+MAX_MEMO_ITEMS = 64
+
+
+def is_pure(logo, proc):
+    """
+    Return True if calls to the user procedure `proc` can be memoized.
+    Results are cached in `logo.pure_procedures` until a procedure is
+    redefined.  Anonymous procedures, such as template lambdas, are never
+    memoized because they share a name.
+    """
+    name = proc.name.lower()
+    if logo.procedures.get(name) is not proc:
+        return False
+    pure_procedures = logo.pure_procedures
+    pure = pure_procedures.get(name)
+    if pure is None:
+        pure = _analyze(logo, proc, set())
+        pure_procedures[name] = pure
+    return pure
+
+
+def _analyze(logo, proc, visiting):
+    name = proc.name.lower()
+    if name in logo.pure_procedures:
+        return logo.pure_procedures[name]
+    if name in visiting:
+        # Assume a recursive call is pure; the rest of the body decides.
+        return True
+    visiting.add(name)
+    names = set(proc.required_inputs)
+    names.update(param for param, _ in proc.optional_inputs)
+    if proc.rest_input:
+        names.add(proc.rest_input)
+    names.update(_local_names(proc.tokens))
+    outputs = []
+    pure = _tokens_are_pure(logo, proc.tokens, names, visiting, outputs)
+    visiting.discard(name)
+    return pure and len(outputs) > 0
+
+
+def _local_names(tokens):
+    names = set()
+    tokens = list(tokens)
+    for n, token in enumerate(tokens):
+        if isinstance(token, (list, tuple)):
+            names.update(_local_names(token))
+        elif isinstance(token, str) and token.lower() in LOCAL_PRIMITIVES:
+            if n + 1 < len(tokens):
+                following = tokens[n + 1]
+                if isinstance(following, str) and following.startswith('"'):
+                    names.add(following[1:])
+                elif isinstance(following, list):
+                    names.update(
+                        word for word in following if isinstance(word, str)
+                    )
+    return names
+
+
+def _tokens_are_pure(logo, tokens, names, visiting, outputs):
+    primitives = logo.primitives
+    procedures = logo.procedures
+    for token in tokens:
+        if isinstance(token, (list, tuple)):
+            if isinstance(token, tuple) and token and token[0] == "?":
+                return False
+            if not _tokens_are_pure(logo, token, names, visiting, outputs):
+                return False
+            continue
+        if isinstance(token, Expression):
+            if not all(name in names for name in token.variables()):
+                return False
+            continue
+        if not isinstance(token, str):
+            continue
+        if token.startswith('"') or token in INFIX_OPERATORS:
+            continue
+        if token.startswith(":"):
+            if token[1:] not in names:
+                return False
+            continue
+        word = token.lower()
+        if word in primitives:
+            primitive_name = primitives[word].name
+            if primitive_name not in PURE_PRIMITIVES:
+                return False
+            if primitive_name == "output":
+                outputs.append(token)
+            continue
+        proc = procedures.get(word)
+        if proc is not None:
+            if not _analyze(logo, proc, visiting):
+                return False
+            continue
+        if word in names:
+            # A bare input name, e.g. in the input list of a LOCAL.
+            continue
+        return False
+    return True
+
+
+def memo_key(proc, args):
+    """
+    Return a hashable key for a call, or None if an argument cannot be
+    used as one or the arguments hold more than `MAX_MEMO_ITEMS` list
+    items.  The type is part of the key so that `1` and `1.0`, which
+    print differently, are kept apart, and so are arrays and lists, which
+    VECTORP tells apart.
+    """
+    budget = [MAX_MEMO_ITEMS]
+    try:
+        key = (proc.name.lower(), tuple(_freeze(arg, budget) for arg in args))
+        hash(key)
+    except (TypeError, _TooLarge):
+        return None
+    return key
+
+
+class _TooLarge(Exception):
+    pass
+
+
+def _freeze(value, budget):
+    if isinstance(value, LIST_TYPES):
+        budget[0] -= len(value)
+        if budget[0] < 0:
+            raise _TooLarge()
+        kind = LogoArray if isinstance(value, LogoArray) else list
+        return (kind, tuple(_freeze(item, budget) for item in value))
+    return (type(value), value)
+
+
+class MemoCache:
+    """
+    Bounded least-recently-used cache of procedure results.
+    """
+
+    def __init__(self, size=DEFAULT_MEMO_SIZE):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entries = self.entries
+        try:
+            value = entries[key]
+        except KeyError:
+            self.misses += 1
+            return None, False
+        entries.move_to_end(key)
+        self.hits += 1
+        return _copy(value), True
+
+    def put(self, key, value):
+        if isinstance(value, list) and _item_count(value) > MAX_MEMO_ITEMS:
+            return
+        entries = self.entries
+        entries[key] = _copy(value)
+        entries.move_to_end(key)
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self.entries = collections.OrderedDict()
+
+
+def _item_count(value):
+    """
+    Items in the list `value` and the lists inside it, counting no further
+    than just past `MAX_MEMO_ITEMS`.
+    """
+    count = 0
+    for item in value:
+        count += 1
+        if isinstance(item, list):
+            count += _item_count(item)
+        if count > MAX_MEMO_ITEMS:
+            break
+    return count
+
+
+def _copy(value):
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
@@ -41,3 +41,18 @@ def rotate_coords(cx, cy, x, y, theta):
     xnew += cx
     ynew += cy
     return (xnew, ynew)
+
+
+def arc_end(x, y, heading, radius, sweep, direction):
+    """
+    Drive from (x, y) at `heading` along a circle of `radius`, turning
+    `sweep` degrees towards `direction` ("lt" or "rt").
+    Return `(center, end, heading)` with the final heading in degrees.
+    """
+    sign = 1 if direction == "lt" else -1
+    theta = deg2rad(heading + sign * 90)
+    xcenter = x + math.cos(theta) * radius
+    ycenter = y + math.sin(theta) * radius
+    theta = deg2rad(heading - sign * 90 + sign * sweep)
+    end = (xcenter + math.cos(theta) * radius, ycenter + math.sin(theta) * radius)
+    return (xcenter, ycenter), end, (heading + sign * sweep) % 360
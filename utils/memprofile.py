@@ -0,0 +1,70 @@
+import os
+import threading
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def current_rss_kb():
+    """
+    Return the resident set size of this process in KiB, or None where
+    /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE // 1024
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class PeakRSS:
+    """
+    Sample the resident set size in a background thread while a block runs
+    and keep the highest value seen.
+
+        with PeakRSS() as mem:
+            ...
+        mem.report()
+    """
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.before_kb = None
+        self.peak_kb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_kb()
+        if rss is not None and (self.peak_kb is None or rss > self.peak_kb):
+            self.peak_kb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.before_kb = current_rss_kb()
+        self.peak_kb = self.before_kb
+        if self.before_kb is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._sample()
+        return False
+
+    def report(self):
+        if self.before_kb is None:
+            return None
+        return {
+            "rss_before_kb": self.before_kb,
+            "peak_rss_kb": self.peak_kb,
+            "peak_increase_kb": self.peak_kb - self.before_kb,
+        }
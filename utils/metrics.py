@@ -0,0 +1,219 @@
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+SIZE_BUCKETS = (0, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+class Registry:
+    """
+    Collection of metrics rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._default = self.labels()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values):
+        """
+        Return the child for a set of label values, creating it if needed.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    "{} expects labels {}.".format(self.name, self.labelnames)
+                )
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_str(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join('{}="{}"'.format(k, _escape(v)) for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} {}".format(self.name, self.kind),
+        ]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def _render_child(self, values, child):
+        return ["{}{} {}".format(self.name, self._label_str(values), _fmt(child.value))]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        """
+        Context manager that observes the elapsed seconds of its block.
+        """
+        return _Timer(self._default)
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append("{}_bucket{} {}".format(
+                self.name, self._label_str(values, [("le", _fmt(bound))]), cumulative
+            ))
+        cumulative += counts[-1]
+        lines.append("{}_bucket{} {}".format(
+            self.name, self._label_str(values, [("le", "+Inf")]), cumulative
+        ))
+        lines.append("{}_sum{} {}".format(self.name, self._label_str(values), _fmt(total)))
+        lines.append("{}_count{} {}".format(self.name, self._label_str(values), cumulative))
+        return lines
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        self.child.observe(self.elapsed)
+        return False
+
+
+def _fmt(value):
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY = Registry()
+
+GRAMMAR_BUILD_SECONDS = Histogram(
+    "pablo_grammar_build_seconds", "Time spent building the Logo token grammar."
+)
+PARSE_SECONDS = Histogram("pablo_parse_seconds", "Time spent parsing Logo source.")
+INTERPRET_SECONDS = Histogram(
+    "pablo_interpret_seconds", "Time spent interpreting a program into commands."
+)
+HISTORY_COMMANDS = Histogram(
+    "pablo_history_commands",
+    "Number of device commands produced per program.",
+    buckets=SIZE_BUCKETS,
+)
+IMAGE_DECODE_SECONDS = Histogram(
+    "pablo_image_decode_seconds", "Time spent decoding uploaded images."
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "pablo_queue_wait_seconds",
+    "Time between accepting a job and its worker starting.",
+)
+TRANSMISSION_SECONDS = Histogram(
+    "pablo_transmission_seconds", "Time spent sending a program to the device."
+)
+COMMAND_LATENCY_SECONDS = Histogram(
+    "pablo_command_latency_seconds",
+    "Time each command takes on the device, including the wait for it to finish.",
+    labelnames=("command",),
+)
+PREVIEW_SECONDS = Histogram(
+    "pablo_preview_seconds", "Time spent compiling and rendering a preview."
+)
+JOBS = Counter("pablo_jobs_total", "Programs accepted for execution.")
+JOB_FAILURES = Counter("pablo_job_failures_total", "Programs that failed to run.")
+TRAVEL_SECONDS_SAVED = Counter(
+    "pablo_travel_seconds_saved_total",
+    "Estimated device seconds saved by reordering strokes.",
+)
+OVERDRAW_SEGMENTS_REMOVED = Counter(
+    "pablo_overdraw_segments_removed_total",
+    "Pen-down segments dropped because they retrace earlier ink.",
+)
+CACHE_HITS = Counter("pablo_cache_hits_total", "Cache hits.", labelnames=("cache",))
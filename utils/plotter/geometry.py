@@ -0,0 +1,350 @@
+"""
+Absolute geometry of a command history.
+
+The device history is relative: turns, moves and pen changes.  `trace()`
+replays it from the home pose into `Stroke`s, runs of pen-down segments
+with absolute end points, so that passes can reason about where the ink
+goes.  `emit()` turns strokes back into relative commands.
+"""
+
+import math
+
+import attr
+
+from ..device import arc_segments
+from ..interpreter.trig import arc_end, calc_distance
+
+HOME = (0, 0)
+HOME_HEADING = 90
+# Distances and turns smaller than these are not worth a command.
+EPSILON = 1e-6
+# Most pen-up moves spent reaching the start of a stroke.
+APPROACH_MOVES = 4
+
+
+@attr.s(slots=True)
+class Segment:
+    """
+    A pen-down line from `start` to `end`, or an arc when `arc` is
+    `(center, radius, sweep, direction)`.
+    """
+
+    start = attr.ib()
+    end = attr.ib()
+    arc = attr.ib(default=None)
+
+    def reversed(self):
+        if self.arc is None:
+            return Segment(self.end, self.start)
+        center, radius, sweep, direction = self.arc
+        direction = "rt" if direction == "lt" else "lt"
+        return Segment(self.end, self.start, (center, radius, sweep, direction))
+
+    def start_heading(self):
+        """
+        Heading the turtle must face to draw this segment.
+        """
+        if self.arc is None:
+            return direction(self.start, self.end)
+        center, _, _, turn = self.arc
+        radial = direction(center, self.start)
+        return radial + 90 if turn == "lt" else radial - 90
+
+    def length(self):
+        if self.arc is None:
+            return distance(self.start, self.end)
+        _, radius, sweep, _ = self.arc
+        return abs(radius) * math.radians(sweep)
+
+
+@attr.s(slots=True)
+class Stroke:
+    """
+    Segments drawn one after another without lifting the pen.
+    """
+
+    start = attr.ib()
+    segments = attr.ib(default=attr.Factory(list))
+
+    @property
+    def end(self):
+        if self.segments:
+            return self.segments[-1].end
+        return self.start
+
+    def reversed(self):
+        segments = [segment.reversed() for segment in reversed(self.segments)]
+        return Stroke(self.end, segments)
+
+
+def distance(p0, p1):
+    return math.hypot(p1[0] - p0[0], p1[1] - p0[1])
+
+
+def direction(p0, p1):
+    """
+    Heading in degrees from `p0` towards `p1`.
+    """
+    return math.degrees(math.atan2(p1[1] - p0[1], p1[0] - p0[0]))
+
+
+def arc_points(segment, tolerance):
+    """
+    Points along an arc segment, close enough together that the chords
+    between them stay within `tolerance` of the curve.
+    """
+    center, radius, sweep, turn = segment.arc
+    start = direction(center, segment.start)
+    signed = sweep if turn == "lt" else -sweep
+    n = arc_segments(radius, sweep, tolerance)
+    points = [segment.start]
+    for k in range(1, n):
+        theta = math.radians(start + signed * k / n)
+        points.append(
+            (
+                center[0] + abs(radius) * math.cos(theta),
+                center[1] + abs(radius) * math.sin(theta),
+            )
+        )
+    points.append(segment.end)
+    return points
+
+
+def walk(commands, pos=HOME, heading=HOME_HEADING):
+    """
+    Replay `commands` one item at a time, without keeping them.  Yields
+    `("start", point)` where the pen starts drawing, `("segment", segment)`
+    for each pen-down move and `("item", item)` for history items without
+    geometry, such as `wait`.  Drawing resumes with a new start after an
+    item if the pen is still down.
+    """
+    pendown = False
+    x, y = pos
+    for item in commands:
+        op = item[0]
+        if op == "fd" or op == "bk":
+            dx, dy = calc_distance(heading, item[1] if op == "fd" else -item[1])
+            end = (x + dx, y + dy)
+            if pendown:
+                yield "segment", Segment((x, y), end)
+            x, y = end
+        elif op == "lt":
+            heading = (heading + item[1]) % 360
+        elif op == "rt":
+            heading = (heading - item[1]) % 360
+        elif op == "arc":
+            _, radius, sweep, turn = item
+            center, end, heading = arc_end(x, y, heading, radius, sweep, turn)
+            if pendown:
+                yield "segment", Segment((x, y), end, (center, radius, sweep, turn))
+            x, y = end
+        elif op == "pd":
+            if not pendown:
+                pendown = True
+                yield "start", (x, y)
+        elif op == "pu":
+            pendown = False
+        else:
+            yield "item", item
+            if pendown:
+                yield "start", (x, y)
+
+
+def trace(commands, pos=HOME, heading=HOME_HEADING):
+    """
+    Replay `commands` into a list of parts: `Stroke`s, and any history
+    items without geometry, such as `wait`, in their original place.
+    A stroke that is interrupted by such an item continues in a new one.
+    """
+    parts = []
+    stroke = None
+    for kind, value in walk(commands, pos, heading):
+        if kind == "segment":
+            stroke.segments.append(value)
+        elif kind == "start":
+            stroke = Stroke(value)
+            parts.append(stroke)
+        else:
+            parts.append(value)
+    return parts
+
+
+def arc_extremes(segment):
+    """
+    Points where an arc segment reaches furthest left, right, up or down.
+    """
+    center, radius, sweep, turn = segment.arc
+    start = direction(center, segment.start)
+    lo, hi = sorted((start, start + (sweep if turn == "lt" else -sweep)))
+    points = []
+    k = math.ceil(lo / 90)
+    while k * 90 <= hi:
+        theta = math.radians(k * 90)
+        points.append(
+            (
+                center[0] + abs(radius) * math.cos(theta),
+                center[1] + abs(radius) * math.sin(theta),
+            )
+        )
+        k += 1
+    return points
+
+
+def ink_bounds(commands):
+    """
+    Bounds of the ink drawn by `commands` as `(xmin, xmax, ymin, ymax)`,
+    or None if nothing is drawn.
+    """
+    return _bounds(walk(commands))
+
+
+def bounds(parts):
+    """
+    Bounds of the ink in traced `parts`, as for `ink_bounds()`.
+    """
+    return _bounds(_events(parts))
+
+
+def _events(parts):
+    for part in parts:
+        if isinstance(part, Stroke):
+            yield "start", part.start
+            for segment in part.segments:
+                yield "segment", segment
+
+
+def _bounds(events):
+    box = None
+    for kind, value in events:
+        if kind == "start":
+            points = [value]
+        elif kind == "segment":
+            points = [value.end]
+            if value.arc is not None:
+                points.extend(arc_extremes(value))
+        else:
+            continue
+        for x, y in points:
+            if box is None:
+                box = (x, x, y, y)
+            else:
+                xmin, xmax, ymin, ymax = box
+                box = (min(xmin, x), max(xmax, x), min(ymin, y), max(ymax, y))
+    return box
+
+
+def emit(parts, pos=HOME, heading=HOME_HEADING):
+    """
+    Turn parts from `trace()` back into relative commands.  The pen stays
+    down between strokes that meet, and moves go backwards when that
+    needs less turning.
+
+    The device only drives whole units and degrees, so every command is
+    rounded as it is made, and each move aims from where the rounded
+    commands really leave the turtle at the absolute point it should end
+    on.  That way the rounding errors don't add up along the drawing.
+    """
+    commands = []
+    pendown = False
+    end = None
+    for part in parts:
+        if not isinstance(part, Stroke):
+            commands.append(part)
+            continue
+        if not (pendown and distance(end, part.start) < EPSILON):
+            if pendown:
+                commands.append(("pu",))
+            pos, heading = _approach(commands, pos, heading, part.start)
+            commands.append(("pd",))
+            pendown = True
+        for segment in part.segments:
+            pos, heading = _move(commands, pos, heading, segment.start)
+            if segment.arc is None:
+                pos, heading = _move(commands, pos, heading, segment.end)
+            else:
+                pos, heading = _arc(commands, pos, heading, segment)
+        end = part.end
+    return commands
+
+
+def travel_distance(parts, pos=HOME):
+    """
+    Total pen-up distance between the strokes in `parts`.
+    """
+    total = 0
+    for part in parts:
+        if isinstance(part, Stroke):
+            total += distance(pos, part.start)
+            pos = part.end
+    return total
+
+
+def _move(commands, pos, heading, target):
+    """
+    Drive from `pos` towards `target` in whole units and degrees, and
+    return where the turtle ends up and its heading.
+    """
+    dist = distance(pos, target)
+    if dist < EPSILON:
+        return pos, heading
+    angle = direction(pos, target)
+    if abs(_turn_angle(heading, angle)) > 90:
+        op = "bk"
+        angle += 180
+    else:
+        op = "fd"
+    turn = round(_turn_angle(heading, angle))
+    # As far along the rounded heading as gets closest to `target`.
+    steps = round(dist * math.cos(math.radians(angle - heading - turn)))
+    if steps == 0:
+        return pos, heading
+    heading = _turn(commands, heading, turn)
+    dx, dy = calc_distance(heading, steps if op == "fd" else -steps)
+    if commands and commands[-1][0] == op:
+        # Straight on from the last move, e.g. where a clipped or
+        # trimmed line meets the next one.
+        steps += commands.pop()[1]
+    commands.append((op, steps))
+    return (pos[0] + dx, pos[1] + dy), heading
+
+
+def _approach(commands, pos, heading, target):
+    """
+    Move with the pen up until the turtle is within rounding of `target`.
+    A long move can end a few units off, and correcting that once the
+    pen is down would draw a line that isn't in the drawing.
+    """
+    for _ in range(APPROACH_MOVES):
+        moved = len(commands)
+        pos, heading = _move(commands, pos, heading, target)
+        if len(commands) == moved or distance(pos, target) <= 0.5:
+            break
+    return pos, heading
+
+
+def _arc(commands, pos, heading, segment):
+    _, radius, sweep, direction = segment.arc
+    radius = round(radius)
+    sweep = round(sweep)
+    if sweep == 0:
+        return pos, heading
+    heading = _turn(
+        commands, heading, round(_turn_angle(heading, segment.start_heading()))
+    )
+    commands.append(("arc", radius, sweep, direction))
+    _, pos, heading = arc_end(pos[0], pos[1], heading, radius, sweep, direction)
+    return pos, heading
+
+
+def _turn(commands, heading, angle):
+    if angle > 0:
+        commands.append(("lt", angle))
+    elif angle < 0:
+        commands.append(("rt", -angle))
+    else:
+        return heading
+    return (heading + angle) % 360
+
+
+def _turn_angle(heading, target):
+    return (target - heading + 180) % 360 - 180
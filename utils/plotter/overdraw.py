@@ -0,0 +1,182 @@
+"""
+Overdraw removal.
+
+Symmetric figures and recursive curves often retrace lines that are
+already on the paper.  `skip_overdraw()` finds pen-down lines that lie
+along ink drawn earlier, within a tolerance, and lifts the pen over the
+part that is drawn twice.  Earlier ink is kept in a spatial hash grid so
+each line is only compared with the lines near it.  Arcs are left alone.
+
+Lifting the pen splits the stroke, so a travel pass that runs afterwards
+is free to draw the remaining pieces in another order and the retraced
+part is not driven at all.
+"""
+
+import math
+
+import attr
+
+from ..device import program_duration
+from . import geometry
+from .geometry import Segment, Stroke
+
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_CELL_SIZE = 16
+PEN_CHANGES = frozenset(["pencolor", "pensize"])
+
+
+@attr.s
+class OverdrawReport:
+    """
+    Lines dropped entirely, lines shortened, and the length of ink saved.
+    """
+
+    segments_removed = attr.ib(default=0)
+    segments_trimmed = attr.ib(default=0)
+    length_removed = attr.ib(default=0)
+    seconds_before = attr.ib(default=0)
+    seconds_after = attr.ib(default=0)
+
+
+@attr.s
+class SegmentGrid:
+    """
+    Spatial hash of line segments.  A segment is filed under the cells of
+    points sampled along it every half cell, and lookups search those cells
+    and their neighbours, so any segment that comes within `cell_size / 2`
+    of the query is found.
+    """
+
+    cell_size = attr.ib(default=DEFAULT_CELL_SIZE)
+    cells = attr.ib(default=attr.Factory(dict))
+    segments = attr.ib(default=attr.Factory(list))
+
+    def add(self, segment):
+        index = len(self.segments)
+        self.segments.append(segment)
+        for cell in self._cells(segment):
+            self.cells.setdefault(cell, []).append(index)
+
+    def near(self, segment):
+        """
+        Return the segments that may lie along `segment`.
+        """
+        found = set()
+        cells = self.cells
+        for cx, cy in self._cells(segment):
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    found.update(cells.get((cx + dx, cy + dy), ()))
+        return [self.segments[index] for index in sorted(found)]
+
+    def _cells(self, segment):
+        size = self.cell_size
+        (x0, y0), (x1, y1) = segment.start, segment.end
+        length = geometry.distance(segment.start, segment.end)
+        steps = max(1, int(math.ceil(length * 2 / size)))
+        cells = set()
+        for n in range(steps + 1):
+            t = n / steps
+            cells.add(
+                (
+                    int(math.floor((x0 + (x1 - x0) * t) / size)),
+                    int(math.floor((y0 + (y1 - y0) * t) / size)),
+                )
+            )
+        return cells
+
+
+def skip_overdraw(commands, tolerance=DEFAULT_TOLERANCE, cell_size=DEFAULT_CELL_SIZE):
+    """
+    Return `(commands, report)` with the pen lifted over lines that retrace
+    earlier ink.  The original commands are returned if nothing is drawn
+    twice.
+    """
+    parts, report = remove_overdraw(geometry.trace(commands), tolerance, cell_size)
+    report.seconds_before = program_duration(commands)
+    if report.segments_removed == 0 and report.segments_trimmed == 0:
+        report.seconds_after = report.seconds_before
+        return list(commands), report
+    result = geometry.emit(parts)
+    report.seconds_after = program_duration(result)
+    return result, report
+
+
+def remove_overdraw(parts, tolerance=DEFAULT_TOLERANCE, cell_size=DEFAULT_CELL_SIZE):
+    """
+    Return `(parts, report)` with the retraced pieces of lines cut out of
+    the strokes in `parts`, splitting them where needed.
+    """
+    grid = SegmentGrid(cell_size=max(cell_size, tolerance * 4))
+    report = OverdrawReport()
+    result = []
+    for part in parts:
+        if not isinstance(part, Stroke):
+            result.append(part)
+            if part[0] in PEN_CHANGES:
+                # A retrace in another pen is not overdraw.
+                grid = SegmentGrid(cell_size=grid.cell_size)
+            continue
+        stroke = None
+        if not part.segments:
+            # A pen dot.
+            result.append(part)
+        for segment in part.segments:
+            if segment.arc is not None:
+                pieces = [segment]
+            else:
+                pieces = _uncovered(segment, grid, tolerance)
+                removed = segment.length() - sum(piece.length() for piece in pieces)
+                if not pieces:
+                    report.segments_removed += 1
+                elif removed > 0:
+                    report.segments_trimmed += 1
+                report.length_removed += removed
+            for piece in pieces:
+                if stroke is None or (
+                    geometry.distance(stroke.end, piece.start) >= geometry.EPSILON
+                ):
+                    stroke = Stroke(piece.start)
+                    result.append(stroke)
+                stroke.segments.append(piece)
+                if piece.arc is None:
+                    grid.add(piece)
+    return result, report
+
+
+def _uncovered(segment, grid, tolerance):
+    """
+    Pieces of `segment` that no earlier ink lies along.
+    """
+    length = segment.length()
+    if length < geometry.EPSILON:
+        return [segment]
+    (x0, y0), (x1, y1) = segment.start, segment.end
+    ux, uy = (x1 - x0) / length, (y1 - y0) / length
+    covered = []
+    for other in grid.near(segment):
+        offsets = []
+        for px, py in (other.start, other.end):
+            if abs((px - x0) * uy - (py - y0) * ux) > tolerance:
+                break
+            offsets.append((px - x0) * ux + (py - y0) * uy)
+        else:
+            lo, hi = max(min(offsets), 0), min(max(offsets), length)
+            if hi - lo > tolerance:
+                covered.append((lo, hi))
+    if not covered:
+        return [segment]
+    covered.sort()
+    pieces = []
+    t = 0
+    for lo, hi in covered:
+        if lo - t > tolerance:
+            pieces.append((t, lo))
+        t = max(t, hi)
+    if length - t > tolerance:
+        pieces.append((t, length))
+    return [
+        Segment((x0 + ux * lo, y0 + uy * lo), (x0 + ux * hi, y0 + uy * hi))
+        for lo, hi in pieces
+    ]
+
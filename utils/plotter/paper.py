@@ -0,0 +1,249 @@
+"""
+Fitting and clipping drawings to the paper.
+
+The paper is a `width` by `height` rectangle centered on the home
+position.  `fit_to_paper()` can scale and move a drawing to fit it, and
+clips pen-down lines against it so the parts that fall outside become
+pen-up travel.  Clipping runs over every line at once with NumPy when it
+is installed.  Arcs that cross the edge are clipped as chords.
+"""
+
+import attr
+
+from . import geometry
+from .geometry import Segment, Stroke, bounds
+
+FIT_MODES = ("none", "shrink", "fit")
+DEFAULT_TOLERANCE = 0.5
+
+
+@attr.s
+class PaperReport:
+    """
+    Drawing bounds before fitting as `(xmin, xmax, ymin, ymax)`, the
+    scale and offset applied, and how many lines were clipped.
+    """
+
+    bounds = attr.ib(default=None)
+    scale = attr.ib(default=1)
+    offset = attr.ib(default=(0, 0))
+    segments_clipped = attr.ib(default=0)
+
+
+def fit_to_paper(
+    commands, width, height, fit="none", clip=True, tolerance=DEFAULT_TOLERANCE
+):
+    """
+    Return `(commands, report)` with the drawing in `commands` fitted to
+    and clipped against the paper.  `fit` is "none" to leave the drawing
+    as it is, "shrink" to scale it down and center it only if it is too
+    big, or "fit" to scale it to fill the paper.  The original commands
+    are returned if nothing changes.
+    """
+    if fit not in FIT_MODES:
+        raise ValueError("Paper fit must be one of {}.".format(", ".join(FIT_MODES)))
+    parts = geometry.trace(commands)
+    report = PaperReport(bounds=bounds(parts))
+    if report.bounds is not None and fit != "none":
+        report.scale, report.offset = fit_transform(report.bounds, width, height, fit)
+        if report.scale != 1 or report.offset != (0, 0):
+            parts = transform(parts, report.scale, report.offset)
+    if clip:
+        parts, report.segments_clipped = clip_to_rect(
+            parts, rect(width, height), tolerance
+        )
+    if report.scale == 1 and report.offset == (0, 0) and not report.segments_clipped:
+        return list(commands), report
+    return geometry.emit(parts), report
+
+
+def rect(width, height):
+    return (-width / 2, width / 2, -height / 2, height / 2)
+
+
+def fit_transform(box, width, height, fit):
+    """
+    Return `(scale, (dx, dy))` that fits `box` on the paper and centers it.
+    """
+    xmin, xmax, ymin, ymax = box
+    xmin_paper, xmax_paper, ymin_paper, ymax_paper = rect(width, height)
+    if (
+        fit == "shrink"
+        and xmin >= xmin_paper
+        and xmax <= xmax_paper
+        and ymin >= ymin_paper
+        and ymax <= ymax_paper
+    ):
+        return 1, (0, 0)
+    scales = []
+    if xmax > xmin:
+        scales.append(width / (xmax - xmin))
+    if ymax > ymin:
+        scales.append(height / (ymax - ymin))
+    scale = min(scales) if scales else 1
+    if fit == "shrink":
+        scale = min(scale, 1)
+    dx = -scale * (xmin + xmax) / 2
+    dy = -scale * (ymin + ymax) / 2
+    return scale, (dx, dy)
+
+
+def transform(parts, scale, offset):
+    """
+    Scale `parts` about the origin by `scale` and then move them by `offset`.
+    """
+    dx, dy = offset
+
+    def point(p):
+        return (p[0] * scale + dx, p[1] * scale + dy)
+
+    result = []
+    for part in parts:
+        if not isinstance(part, Stroke):
+            result.append(part)
+            continue
+        stroke = Stroke(point(part.start))
+        for segment in part.segments:
+            arc = segment.arc
+            if arc is not None:
+                center, radius, sweep, direction = arc
+                arc = (point(center), radius * scale, sweep, direction)
+            stroke.segments.append(
+                Segment(point(segment.start), point(segment.end), arc)
+            )
+        result.append(stroke)
+    return result
+
+
+def clip_to_rect(parts, box, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return `(parts, clipped)` with the pen-down lines in `parts` cut to the
+    rectangle `box`, given as `(xmin, xmax, ymin, ymax)`.  Strokes are split
+    where they leave the rectangle; `clipped` counts the lines that were
+    cut or dropped.
+    """
+    # Flatten into one list of lines, keeping arcs that stay inside whole.
+    lines = []
+    for n, part in enumerate(parts):
+        if not isinstance(part, Stroke):
+            continue
+        for segment in part.segments:
+            if segment.arc is None or _arc_inside(segment, box):
+                lines.append((n, segment))
+            else:
+                lines.extend((n, chord) for chord in _chords(segment, tolerance))
+    spans = _clip_spans([segment for _, segment in lines], box)
+
+    by_part = {}
+    for (n, segment), span in zip(lines, spans):
+        by_part.setdefault(n, []).append((segment, span))
+    result = []
+    clipped = 0
+    for n, part in enumerate(parts):
+        if not isinstance(part, Stroke):
+            result.append(part)
+            continue
+        if not part.segments:
+            if _inside(part.start, box):
+                result.append(part)
+            continue
+        stroke = None
+        for segment, span in by_part.get(n, ()):
+            if span is None:
+                clipped += 1
+                stroke = None
+                continue
+            t0, t1 = span
+            if t0 > 0 or t1 < 1:
+                clipped += 1
+                segment = _sub_segment(segment, t0, t1)
+            if stroke is None or (
+                geometry.distance(stroke.end, segment.start) >= geometry.EPSILON
+            ):
+                stroke = Stroke(segment.start)
+                result.append(stroke)
+            stroke.segments.append(segment)
+            if t1 < 1:
+                stroke = None
+    return result, clipped
+
+
+def _clip_spans(segments, box):
+    """
+    Liang-Barsky clipping.  Return for each line the visible part as
+    `(t0, t1)`, fractions of the way along it, or None if it is outside.
+    """
+    # NumPy is slow to import, so only load it once there is clipping to do.
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is None:
+        return [_clip_span(segment, box) for segment in segments]
+    if not segments:
+        return []
+    xmin, xmax, ymin, ymax = box
+    ends = numpy.array(
+        [segment.start + segment.end for segment in segments], dtype=float
+    )
+    x0, y0, x1, y1 = ends.T
+    dx = x1 - x0
+    dy = y1 - y0
+    p = numpy.stack([-dx, dx, -dy, dy])
+    q = numpy.stack([x0 - xmin, xmax - x0, y0 - ymin, ymax - y0])
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        r = q / p
+    t0 = numpy.max(numpy.where(p < 0, r, 0), axis=0)
+    t1 = numpy.min(numpy.where(p > 0, r, 1), axis=0)
+    outside = numpy.any((p == 0) & (q < 0), axis=0) | (t0 > t1)
+    return [
+        None if out else (start, end)
+        for out, start, end in zip(outside.tolist(), t0.tolist(), t1.tolist())
+    ]
+
+
+def _clip_span(segment, box):
+    xmin, xmax, ymin, ymax = box
+    (x0, y0), (x1, y1) = segment.start, segment.end
+    dx = x1 - x0
+    dy = y1 - y0
+    t0, t1 = 0, 1
+    edges = ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0))
+    for p, q in edges:
+        if p == 0:
+            if q < 0:
+                return None
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+    if t0 > t1:
+        return None
+    return (t0, t1)
+
+
+def _sub_segment(segment, t0, t1):
+    (x0, y0), (x1, y1) = segment.start, segment.end
+    dx = x1 - x0
+    dy = y1 - y0
+    return Segment((x0 + dx * t0, y0 + dy * t0), (x0 + dx * t1, y0 + dy * t1))
+
+
+def _inside(point, box, slack=0):
+    xmin, xmax, ymin, ymax = box
+    return (
+        xmin - slack <= point[0] <= xmax + slack
+        and ymin - slack <= point[1] <= ymax + slack
+    )
+
+
+def _arc_inside(segment, box):
+    # Allow for rounding, so an arc fitted to the edge is not cut into chords.
+    points = geometry.arc_extremes(segment) + [segment.start, segment.end]
+    return all(_inside(point, box, geometry.EPSILON) for point in points)
+
+
+def _chords(segment, tolerance):
+    points = geometry.arc_points(segment, tolerance)
+    return [Segment(p0, p1) for p0, p1 in zip(points, points[1:])]
+
@@ -0,0 +1,137 @@
+"""
+Raster previews of a command history.
+
+`render_png()` draws the pen-down lines of a history into a PNG with
+OpenCV, in the pen colour and size the program set, so a drawing can be
+checked without running it on the device.
+"""
+
+import cv2
+import numpy as np
+
+from . import geometry
+from .geometry import Stroke, bounds
+
+# LogTurtle draws white on black until told otherwise.
+BACKGROUND = "black"
+DEFAULT_PENCOLOR = "white"
+DEFAULT_PENSIZE = 1
+# Named colors as RGB, covering the names in `procedure.COLOR_MAP`.
+NAMED_COLORS = {
+    "black": (0, 0, 0),
+    "blue": (0, 0, 255),
+    "green": (0, 128, 0),
+    "cyan": (0, 255, 255),
+    "red": (255, 0, 0),
+    "magenta": (255, 0, 255),
+    "yellow": (255, 255, 0),
+    "white": (255, 255, 255),
+    "brown": (165, 42, 42),
+    "tan": (210, 180, 140),
+    "forest": (34, 139, 34),
+    "aqua": (0, 255, 255),
+    "salmon": (250, 128, 114),
+    "purple": (128, 0, 128),
+    "orange": (255, 165, 0),
+    "grey": (128, 128, 128),
+    "gray": (128, 128, 128),
+}
+# Points are passed to OpenCV in fixed point with this many fraction bits.
+SHIFT = 4
+# Smallest view in turtle units, so a drawing of only dots still has a
+# scale.  The SVG export pads its view by the same amount.
+MIN_SPAN = 20
+
+
+def render_png(commands, size=512, margin=16, box=None):
+    """
+    Render `commands` into a `size` by `size` PNG and return its bytes.
+    The view fits `box`, given as `(xmin, xmax, ymin, ymax)`, or the
+    drawing itself if `box` is None.
+    """
+    parts = geometry.trace(commands)
+    if box is None:
+        box = bounds(parts) or (-1, 1, -1, 1)
+    xmin, xmax, ymin, ymax = box
+    span = max(xmax - xmin, ymax - ymin, MIN_SPAN)
+    scale = max(size - 2 * margin, 1) / span
+    # Center the view and flip y, since image rows run downwards.
+    xoffset = size / 2 - scale * (xmin + xmax) / 2
+    yoffset = size / 2 + scale * (ymin + ymax) / 2
+    one = 1 << SHIFT
+
+    def pixels(points):
+        points = np.asarray(points, dtype=float)
+        x = (points[:, 0] * scale + xoffset) * one
+        y = (yoffset - points[:, 1] * scale) * one
+        return np.stack([x, y], axis=1).round().astype(np.int32)
+
+    image = np.empty((size, size, 3), dtype=np.uint8)
+    image[:] = _bgr(BACKGROUND)
+    pencolor = DEFAULT_PENCOLOR
+    pensize = DEFAULT_PENSIZE
+    # Batch strokes that share a pen into one OpenCV call.
+    lines = []
+    dots = []
+    for part in parts:
+        if not isinstance(part, Stroke):
+            if part[0] == "pencolor" or part[0] == "pensize":
+                _draw(image, lines, dots, pencolor, pensize * scale)
+                lines = []
+                dots = []
+                if part[0] == "pencolor":
+                    pencolor = part[1]
+                else:
+                    pensize = part[1]
+            continue
+        if not part.segments:
+            dots.append(pixels([part.start])[0])
+            continue
+        points = [part.start]
+        for segment in part.segments:
+            if segment.arc is None:
+                points.append(segment.end)
+            else:
+                # Chords within a quarter of a pixel of the curve.
+                points.extend(geometry.arc_points(segment, 0.25 / scale)[1:])
+        lines.append(pixels(points))
+    _draw(image, lines, dots, pencolor, pensize * scale)
+    ok, png = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError("Could not encode the preview as PNG.")
+    return png.tobytes()
+
+
+def _draw(image, lines, dots, pencolor, width):
+    color = _bgr(pencolor)
+    # No wider than the image, which OpenCV can't draw anyway.
+    thickness = min(max(1, int(round(width))), max(image.shape[:2]))
+    if lines:
+        cv2.polylines(image, lines, False, color, thickness, cv2.LINE_AA, SHIFT)
+    for dot in dots:
+        cv2.circle(
+            image,
+            (int(dot[0]), int(dot[1])),
+            max(1, thickness // 2) << SHIFT,
+            color,
+            -1,
+            cv2.LINE_AA,
+            SHIFT,
+        )
+
+
+def _bgr(color):
+    """
+    OpenCV color for a LogTurtle pen color: a name or `#rrggbb`.
+    Unknown colors draw in the default pen color.
+    """
+    if isinstance(color, str) and color.startswith("#") and len(color) == 7:
+        try:
+            r, g, b = (int(color[n : n + 2], 16) for n in (1, 3, 5))
+        except ValueError:
+            r, g, b = NAMED_COLORS[DEFAULT_PENCOLOR]
+    else:
+        r, g, b = NAMED_COLORS.get(
+            str(color).lower(), NAMED_COLORS[DEFAULT_PENCOLOR]
+        )
+    return (b, g, r)
@@ -0,0 +1,189 @@
+"""
+Streaming SVG export of a command history.
+
+`iter_svg()` walks the history once to find the bounds and once more to
+write the drawing, yielding the document in chunks as it goes, so the
+size of the output does not change how much memory it takes.  Pen-down
+moves made with the same pen are merged into one `<path>`; lifting the
+pen only starts a new subpath.  Arcs are written as SVG arcs.
+"""
+
+import math
+from xml.sax.saxutils import quoteattr
+
+from . import geometry
+
+# LogTurtle draws white on black until told otherwise.
+BACKGROUND = "black"
+DEFAULT_PENCOLOR = "white"
+DEFAULT_PENSIZE = 1
+CHUNK_SIZE = 64 * 1024
+MARGIN = 10
+
+
+def write_svg(commands, fout, box=None):
+    """
+    Write the drawing made by `commands` as SVG to the text file `fout`.
+    """
+    for chunk in iter_svg(commands, box=box):
+        fout.write(chunk)
+
+
+def iter_svg(commands, box=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the SVG document for `commands` in chunks of about `chunk_size`
+    characters.  The view fits `box`, given as `(xmin, xmax, ymin, ymax)`,
+    or the drawing itself if `box` is None.
+    """
+    if box is None:
+        box = geometry.ink_bounds(commands) or (0, 0, 0, 0)
+    xmin, xmax, ymin, ymax = box
+    # Turtle y runs up and SVG y runs down, so the drawing is flipped and
+    # its view starts at -ymax.
+    view = (
+        xmin - MARGIN,
+        -ymax - MARGIN,
+        xmax - xmin + 2 * MARGIN,
+        ymax - ymin + 2 * MARGIN,
+    )
+    x, y, width, height = (_num(v) for v in view)
+    buffer = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+        'width="100%" height="100%" '
+        'viewBox="{} {} {} {}">\n'.format(x, y, width, height),
+        '<rect x="{}" y="{}" width="{}" height="{}" fill={}/>\n'.format(
+            x, y, width, height, quoteattr(BACKGROUND)
+        ),
+        '<g transform="scale(1 -1)" fill="none" stroke-linecap="round" '
+        'stroke-linejoin="round">\n',
+    ]
+    size = 0
+    path = _PathWriter()
+    for kind, value in geometry.walk(commands):
+        if kind == "start":
+            text = path.start(value)
+        elif kind == "segment":
+            text = path.segment(value)
+        elif value[0] == "pencolor" or value[0] == "pensize":
+            text = path.pen(value[0], value[1])
+        else:
+            continue
+        if text:
+            buffer.append(text)
+            size += len(text)
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer = []
+                size = 0
+    buffer.append(path.close())
+    buffer.append("</g>\n</svg>\n")
+    yield "".join(buffer)
+
+
+class _PathWriter:
+    """
+    Path data for the pen-down moves of one pen at a time.
+    """
+
+    def __init__(self):
+        self.pencolor = DEFAULT_PENCOLOR
+        self.pensize = DEFAULT_PENSIZE
+        self.open = False
+        # Where the path data left off, and where the pen went down if
+        # nothing has been drawn from there yet.
+        self.current = None
+        self.pending = None
+
+    def start(self, point):
+        text = ""
+        if self.pending is None or (
+            geometry.distance(self.pending, point) >= geometry.EPSILON
+        ):
+            text = self._dot()
+        self.pending = point
+        return text
+
+    def segment(self, segment):
+        text = [self._open()]
+        start = segment.start
+        if self.current is None or (
+            geometry.distance(self.current, start) >= geometry.EPSILON
+        ):
+            text.append("M{} {}".format(_num(start[0]), _num(start[1])))
+        text.append(_segment_data(segment))
+        self.current = segment.end
+        self.pending = None
+        return "".join(text)
+
+    def pen(self, op, value):
+        # A pen that is down but hasn't moved yet draws in the new pen.
+        text = self._close_path()
+        if op == "pencolor":
+            self.pencolor = value
+        else:
+            self.pensize = value
+        return text
+
+    def close(self):
+        text = self._dot()
+        return text + self._close_path()
+
+    def _close_path(self):
+        self.current = None
+        if not self.open:
+            return ""
+        self.open = False
+        return '"/>\n'
+
+    def _open(self):
+        if self.open:
+            return ""
+        self.open = True
+        return '<path stroke={} stroke-width={} d="'.format(
+            quoteattr(str(self.pencolor)), quoteattr(_num(self.pensize))
+        )
+
+    def _dot(self):
+        # The pen went down and came up again without moving.  A zero
+        # length line shows as a dot with round caps.
+        point = self.pending
+        self.pending = None
+        if point is None or (
+            self.current is not None
+            and geometry.distance(self.current, point) < geometry.EPSILON
+        ):
+            return ""
+        self.current = point
+        return "{}M{} {}l0 0".format(self._open(), _num(point[0]), _num(point[1]))
+
+
+def _segment_data(segment):
+    x, y = segment.end
+    if segment.arc is None:
+        return "L{} {}".format(_num(x), _num(y))
+    center, radius, sweep, turn = segment.arc
+    radius = abs(radius)
+    flag = 1 if turn == "lt" else 0
+    # An SVG arc can't end where it starts, so long arcs go in pieces
+    # shorter than a half turn.
+    pieces = int(sweep // 180) + 1
+    start = geometry.direction(center, segment.start)
+    step = (sweep if turn == "lt" else -sweep) / pieces
+    data = []
+    for k in range(1, pieces + 1):
+        if k < pieces:
+            theta = math.radians(start + step * k)
+            x = center[0] + radius * math.cos(theta)
+            y = center[1] + radius * math.sin(theta)
+        else:
+            x, y = segment.end
+        data.append(
+            "A{0} {0} 0 0 {1} {2} {3}".format(_num(radius), flag, _num(x), _num(y))
+        )
+    return "".join(data)
+
+
+def _num(value):
+    text = "{:.2f}".format(value).rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
@@ -0,0 +1,144 @@
+"""
+Pen-up travel optimization.
+
+Programs draw disconnected shapes in whatever order the code produced
+them.  `optimize_travel()` reorders the strokes of a history, and may
+reverse them, so the device spends less time driving with the pen up.
+Strokes are ordered by nearest neighbour and then improved with 2-opt.
+Items without geometry, such as `wait`, stay where they are and strokes
+are only reordered between them.
+"""
+
+import attr
+
+from ..device import program_duration
+from . import geometry
+from .geometry import Stroke, distance
+
+# 2-opt is quadratic in the number of strokes per pass.
+TWO_OPT_MAX_STROKES = 1000
+TWO_OPT_MAX_PASSES = 4
+
+
+@attr.s
+class TravelReport:
+    """
+    Pen-up distance and estimated device seconds before and after.
+    """
+
+    travel_before = attr.ib()
+    travel_after = attr.ib()
+    seconds_before = attr.ib()
+    seconds_after = attr.ib()
+
+    @property
+    def seconds_saved(self):
+        return self.seconds_before - self.seconds_after
+
+
+def optimize_travel(commands, reverse=True):
+    """
+    Return `(commands, report)` with the strokes of `commands` reordered to
+    cut pen-up travel.  When `reverse` is true strokes may also be drawn
+    end to start.  The original commands are returned if reordering would
+    not make the program faster.
+    """
+    parts = geometry.trace(commands)
+    optimized = []
+    pos = geometry.HOME
+    strokes = []
+    for part in parts:
+        if isinstance(part, Stroke):
+            strokes.append(part)
+            continue
+        pos = _order(strokes, pos, reverse, optimized)
+        strokes = []
+        optimized.append(part)
+    _order(strokes, pos, reverse, optimized)
+
+    result = geometry.emit(optimized)
+    report = TravelReport(
+        travel_before=geometry.travel_distance(parts),
+        travel_after=geometry.travel_distance(optimized),
+        seconds_before=program_duration(commands),
+        seconds_after=program_duration(result),
+    )
+    if report.seconds_after >= report.seconds_before:
+        report.travel_after = report.travel_before
+        report.seconds_after = report.seconds_before
+        return list(commands), report
+    return result, report
+
+
+def _order(strokes, pos, reverse, out):
+    """
+    Append `strokes` to `out` in a short travel order starting from `pos`.
+    Returns the position after the last stroke.
+    """
+    if not strokes:
+        return pos
+    tour = _nearest_neighbour(strokes, pos, reverse)
+    if reverse and len(tour) <= TWO_OPT_MAX_STROKES:
+        _two_opt(tour, pos)
+    out.extend(tour)
+    return tour[-1].end
+
+
+def _nearest_neighbour(strokes, pos, reverse):
+    remaining = list(strokes)
+    tour = []
+    while remaining:
+        best = None
+        best_index = 0
+        best_flip = False
+        for n, stroke in enumerate(remaining):
+            d = distance(pos, stroke.start)
+            if best is None or d < best:
+                best, best_index, best_flip = d, n, False
+            if reverse:
+                d = distance(pos, stroke.end)
+                if d < best:
+                    best, best_index, best_flip = d, n, True
+        stroke = remaining.pop(best_index)
+        if best_flip:
+            stroke = stroke.reversed()
+        tour.append(stroke)
+        pos = stroke.end
+    return tour
+
+
+def _two_opt(tour, pos):
+    """
+    Reverse runs of `tour` in place while that shortens the travel.
+    Reversing strokes i..j reverses each of them too, so only the two
+    links at either end of the run change length.
+    """
+    starts = [pos] + [stroke.start for stroke in tour]
+    ends = [pos] + [stroke.end for stroke in tour]
+    flipped = [False] * len(tour)
+    order = list(range(len(tour)))
+    size = len(starts)
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+        for i in range(size - 2):
+            for j in range(i + 1, size):
+                before = distance(ends[i], starts[i + 1])
+                after = distance(ends[i], ends[j])
+                if j + 1 < size:
+                    before += distance(ends[j], starts[j + 1])
+                    after += distance(starts[i + 1], starts[j + 1])
+                if after < before - geometry.EPSILON:
+                    starts[i + 1 : j + 1], ends[i + 1 : j + 1] = (
+                        ends[j:i:-1],
+                        starts[j:i:-1],
+                    )
+                    order[i:j] = order[i:j][::-1]
+                    for n in range(i, j):
+                        flipped[order[n]] = not flipped[order[n]]
+                    improved = True
+        if not improved:
+            break
+    strokes = list(tour)
+    tour[:] = [
+        strokes[n].reversed() if flipped[n] else strokes[n] for n in order
+    ]
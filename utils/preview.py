@@ -0,0 +1,65 @@
+import collections
+import concurrent.futures
+import hashlib
+import threading
+
+from . import metrics
+
+DEFAULT_SIZE = 512
+DEFAULT_WORKERS = 2
+DEFAULT_CACHE_SIZE = 64
+
+
+class PreviewRenderer:
+    """
+    Compiles programs and renders them to PNG on a pool of worker threads.
+    Results are kept in a least-recently-used cache keyed by a hash of the
+    program and the image size, and requests for a preview that is still
+    rendering wait for that render instead of starting another.
+    """
+
+    def __init__(
+        self, compiler, workers=DEFAULT_WORKERS, cache_size=DEFAULT_CACHE_SIZE, box=None
+    ):
+        self.compiler = compiler
+        self.cache_size = cache_size
+        self.box = box
+        self.workers = workers
+        self._executor = None
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, program, size=DEFAULT_SIZE):
+        """
+        Return PNG bytes for `program`.  Compile errors are raised here.
+        """
+        key = hashlib.sha256("{}\0{}".format(size, program).encode()).hexdigest()
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self._entries.move_to_end(key)
+                metrics.CACHE_HITS.labels("preview").inc()
+            else:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="preview"
+                    )
+                future = self._executor.submit(self._render, program, size)
+                self._entries[key] = future
+                if len(self._entries) > self.cache_size:
+                    self._entries.popitem(last=False)
+        try:
+            return future.result()
+        except Exception:
+            # Don't cache failures; the program may be fixed and resent.
+            with self._lock:
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+            raise
+
+    def _render(self, program, size):
+        ## the vision stack (cv2, numpy) is slow to import, so load it on first use
+        from .plotter.raster import render_png
+        with metrics.PREVIEW_SECONDS.time():
+            commands = self.compiler(program)
+            return render_png(commands, size=size, box=self.box)
@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+import threading
+
+from flask import Response, abort, request
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Vite emits content-hashed names such as `index-BlEk9g_v.js`.
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)
+PRECOMPRESSED = {".gz": "gzip", ".br": "br"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class Asset:
+    """
+    A static file held in memory together with its compressed variants.
+    """
+
+    def __init__(self, name, data, mimetype):
+        self.name = name
+        self.mimetype = mimetype
+        self.variants = {"identity": data}
+        self.etag = hashlib.sha1(data).hexdigest()[:20]
+        if HASHED_NAME.search(name):
+            self.cache_control = IMMUTABLE
+        else:
+            self.cache_control = REVALIDATE
+
+    @property
+    def compressible(self):
+        return self.mimetype.startswith(COMPRESSIBLE_TYPES)
+
+    def add_variant(self, encoding, data):
+        """
+        Keep a compressed variant only if it is actually smaller.
+        """
+        if len(data) < len(self.variants["identity"]):
+            self.variants[encoding] = data
+
+    def compress(self):
+        if not self.compressible:
+            return
+        data = self.variants["identity"]
+        if "gzip" not in self.variants:
+            self.add_variant("gzip", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None and "br" not in self.variants:
+            self.add_variant("br", brotli.compress(data))
+
+    def negotiate(self, accept_encodings):
+        """
+        Pick the smallest variant the client accepts.
+        """
+        best = "identity"
+        for encoding, data in self.variants.items():
+            if encoding == "identity" or accept_encodings[encoding] <= 0:
+                continue
+            if len(data) < len(self.variants[best]):
+                best = encoding
+        return best
+
+
+class AssetStore:
+    """
+    In-memory static file server for the web UI.
+    Files are read and compressed once, then served with strong ETags,
+    `Accept-Encoding` negotiation and long-lived caching for hashed names.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = None
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """
+        Load the assets on first use rather than at import time.
+        """
+        if self.assets is None:
+            with self._lock:
+                if self.assets is None:
+                    self.load()
+        return self.assets
+
+    def load(self):
+        assets = {}
+        for root, dirs, files in os.walk(self.folder):
+            for filename in files:
+                base, ext = os.path.splitext(filename)
+                if ext in PRECOMPRESSED:
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                with open(path, "rb") as f:
+                    asset = Asset(name, f.read(), mimetype)
+                for suffix, encoding in PRECOMPRESSED.items():
+                    if _is_fresh(path + suffix, path):
+                        with open(path + suffix, "rb") as f:
+                            asset.add_variant(encoding, f.read())
+                asset.compress()
+                assets[name] = asset
+        self.assets = assets
+        return self
+
+    def build(self):
+        """
+        Write `.gz` and `.br` files next to each compressible asset so that
+        `load()` can skip compression at startup.
+        """
+        self.load()
+        for name, asset in self.assets.items():
+            path = os.path.join(self.folder, name)
+            for suffix, encoding in PRECOMPRESSED.items():
+                data = asset.variants.get(encoding)
+                if data is not None:
+                    with open(path + suffix, "wb") as f:
+                        f.write(data)
+
+    def serve(self, filename):
+        asset = self.ensure_loaded().get(filename)
+        if asset is None:
+            abort(404)
+        encoding = asset.negotiate(request.accept_encodings)
+        etag = asset.etag if encoding == "identity" else "{}-{}".format(asset.etag, encoding)
+        headers = {
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if request.if_none_match.contains(etag):
+            metrics.CACHE_HITS.labels("static").inc()
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype, headers=headers)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        return response
+
+
+def _is_fresh(path, source):
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else "static"
+    AssetStore(folder).build()
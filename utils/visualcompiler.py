@@ -0,0 +1,123 @@
+import collections
+import re
+import statistics
+
+Card = collections.namedtuple("Card", "text x y w h")
+
+MARKERS = ("start", "end")
+BRACKETS = re.compile(r"([\[\]])")
+
+
+def cards_from_barcodes(barcodes):
+    """
+    Convert zxing barcodes into layout cards (centre point and size).
+    """
+    cards = []
+    for barcode in barcodes:
+        p = barcode.position
+        points = (p.top_left, p.top_right, p.bottom_right, p.bottom_left)
+        x = sum(pt.x for pt in points) / 4.0
+        y = sum(pt.y for pt in points) / 4.0
+        w = max(abs(p.top_right.x - p.top_left.x), 1)
+        h = max(abs(p.bottom_left.y - p.top_left.y), 1)
+        cards.append(Card(barcode.text, x, y, w, h))
+    return cards
+
+
+def group_rows(cards):
+    """
+    Cluster cards into rows by their vertical centre.
+    A card starts a new row when it is more than half a card height below
+    the running centre of the current row.
+    """
+    if len(cards) == 0:
+        return []
+    tolerance = statistics.median(card.h for card in cards) / 2.0
+    rows = []
+    row = []
+    row_y = None
+    for card in sorted(cards, key=lambda c: c.y):
+        if row and card.y - row_y > tolerance:
+            rows.append(sorted(row, key=lambda c: c.x))
+            row = []
+        row.append(card)
+        row_y = sum(c.y for c in row) / len(row)
+    rows.append(sorted(row, key=lambda c: c.x))
+    return rows
+
+
+def card_tokens(text):
+    """
+    Split the text of a card into interpreter tokens.  Brackets are kept
+    as `[` and `]` tokens, since a list may open on one card and close on
+    another; the text between them is parsed with the Logo grammar.
+    """
+    # The grammar is slow to build, so only load it once cards are read.
+    from .codetocommands import get_grammar
+    from .interpreter.interpreter import parse_token_list
+
+    tokens = []
+    for piece in BRACKETS.split(text):
+        if piece == "[" or piece == "]":
+            tokens.append(piece)
+        elif piece.strip():
+            tokens.extend(parse_token_list(get_grammar(), piece))
+    return tokens
+
+
+def compile_cards(cards):
+    """
+    Build the interpreter token list for a card layout.
+
+    Each row of cards is one statement.  A row indented further than the
+    row above it opens a nested instruction list which is attached to that
+    row, so
+
+        repeat 4
+            fd 100
+            rt 90
+
+    becomes `["repeat", 4, ["fd", 100, "rt", 90]]`.  Bracket cards can
+    also be used to nest explicitly; rows inside an open bracket belong to
+    it whatever their indentation.
+    """
+    origin = None
+    for card in cards:
+        if card.text.lower() == "start":
+            origin = card
+            break
+    cards = [card for card in cards if card.text.lower() not in MARKERS]
+    rows = group_rows(cards)
+    if len(rows) == 0:
+        return []
+    unit = statistics.median(card.w for card in cards)
+    left = min(row[0].x for row in rows)
+    if origin is not None:
+        left = min(left, origin.x)
+    program = []
+    blocks = [(0, program)]
+    nesting = [program]
+    for row in rows:
+        level = round((row[0].x - left) / unit)
+        if len(nesting) == 1:
+            while len(blocks) > 1 and level < blocks[-1][0]:
+                blocks.pop()
+                nesting = [blocks[-1][1]]
+            block_level = blocks[-1][0]
+            if level > block_level and len(nesting[-1]) > 0:
+                body = []
+                nesting[-1].append(body)
+                blocks.append((level, body))
+                nesting = [body]
+        for card in row:
+            for token in card_tokens(card.text):
+                if token == "[":
+                    lst = []
+                    nesting[-1].append(lst)
+                    nesting.append(lst)
+                elif token == "]":
+                    if len(nesting) > 1:
+                        nesting.pop()
+                else:
+                    nesting[-1].append(token)
+    return program
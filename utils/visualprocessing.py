@@ -4,16 +4,41 @@ import os
 import numpy as np
 import cv2
 
-def readCode(image):
+from .visualcompiler import cards_from_barcodes, compile_cards
+from . import metrics
+
+def readBarcodes(image):
     detected_barcodes = zxingcpp.read_barcodes(image)
-    
-    sortedBarcodes = sorted(detected_barcodes, key=lambda barcode: (barcode.position.top_left.y, barcode.position.top_left.x))
+
+    return sorted(detected_barcodes, key=lambda barcode: (barcode.position.top_left.y, barcode.position.top_left.x))
+
+def readCode(image):
     codes = []
-    for barcode in sortedBarcodes:
+    for barcode in readBarcodes(image):
         code = barcode.text
         codes.append(code)
     return codes
 
+def extractCommands(codes):
+    """
+    Drop the `start` and `end` marker cards, leaving only the program.
+    """
+    return [code for code in codes if code.lower() not in ("start", "end")]
+
+def orientedBarcodes(image):
+    """
+    Rotate the image until the first barcode read is the `start` card.
+    Returns the sorted barcodes, or None if no orientation works.
+    """
+    for _ in range(4):
+        barcodes = readBarcodes(image)
+        if len(barcodes) == 0:
+            return None
+        if barcodes[0].text.lower() == "start":
+            return barcodes
+        image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    return None
+
 def properOrientedOutput(image):
     n=0
     while True:
@@ -23,7 +48,8 @@ def properOrientedOutput(image):
                 "status": "failed",
                 "message": "Too many Failed attempts. \nAborting. \nPlease check Image again."
             }
-        codes = readCode(image)
+        barcodes = readBarcodes(image)
+        codes = [barcode.text for barcode in barcodes]
         if not(len(codes) > 2):
             print(codes)
             print("letting run once again")
@@ -34,21 +60,107 @@ def properOrientedOutput(image):
             print(f"Image rotated. \nTrying again.")
         else:
             break
-    for code in codes:
-        if code.lower() == 'Start' or code.lower() == 'end':
-            codes.remove(code)
     return {
         "status": "success",
-        "commands": codes
+        "commands": extractCommands(codes),
+        "program": compile_cards(cards_from_barcodes(barcodes))
     }
 
 
-def process_image(file):
-    file_bytes = np.frombuffer(file.read(), np.uint8)
-    image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+def read_upload(file, max_bytes):
+    """
+    Return the uploaded file as a uint8 array, or None if it is larger than
+    `max_bytes`.  Small uploads are still held in memory by the spooled file,
+    so they are viewed in place instead of being copied.
+    """
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    if size > max_bytes:
+        return None
+    # SpooledTemporaryFile keeps small uploads in a BytesIO until it rolls over.
+    inner = getattr(stream, "_file", stream)
+    if hasattr(inner, "getbuffer"):
+        return np.frombuffer(inner.getbuffer(), np.uint8, count=size)
+    data = np.empty(size, np.uint8)
+    view = memoryview(data)
+    filled = 0
+    while filled < size:
+        n = stream.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return data[:filled]
+
+def imageSize(data):
+    """
+    Read (width, height) from a PNG or JPEG header without decoding.
+    Returns None for other formats.
+    """
+    header = bytes(data[:24])
+    if header[:8] == b"\x89PNG\r\n\x1a\n" and len(header) >= 24:
+        return (int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big"))
+    if header[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    n = len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        length = (int(data[i + 2]) << 8) | int(data[i + 3])
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = (int(data[i + 5]) << 8) | int(data[i + 6])
+            width = (int(data[i + 7]) << 8) | int(data[i + 8])
+            return (width, height)
+        i += 2 + length
+    return None
+
+REDUCED_GRAYSCALE = ((1, cv2.IMREAD_GRAYSCALE), (2, cv2.IMREAD_REDUCED_GRAYSCALE_2), (4, cv2.IMREAD_REDUCED_GRAYSCALE_4), (8, cv2.IMREAD_REDUCED_GRAYSCALE_8))
+REDUCED_COLOR = ((1, cv2.IMREAD_COLOR), (2, cv2.IMREAD_REDUCED_COLOR_2), (4, cv2.IMREAD_REDUCED_COLOR_4), (8, cv2.IMREAD_REDUCED_COLOR_8))
+
+def decodeImage(data, max_dimension, grayscale=True):
+    """
+    Decode PNG or JPEG bytes, letting the decoder downscale by 2, 4 or 8
+    when the image is larger than `max_dimension`.  Returns None if it is
+    still too large, cannot be decoded, or is in another format, since the
+    size of those can't be checked before decoding.
+    """
+    modes = REDUCED_GRAYSCALE if grayscale else REDUCED_COLOR
+    size = imageSize(data)
+    if size is None:
+        return None
+    for factor, flags in modes:
+        if max(size) <= max_dimension * factor:
+            break
+    else:
+        return None
+    image = cv2.imdecode(data, flags)
+    if image is None or max(image.shape[:2]) > max_dimension:
+        return None
+    return image
+
+
+def process_image(file, max_bytes=8 * 1024 * 1024, max_dimension=4096, grayscale=True):
+    file_bytes = read_upload(file, max_bytes)
+    if file_bytes is None:
+        return {
+            "status": "failed",
+            "message": f"Image is larger than {max_bytes} bytes."
+        }
+    with metrics.IMAGE_DECODE_SECONDS.time():
+        image = decodeImage(file_bytes, max_dimension, grayscale=grayscale)
+    del file_bytes
+    if image is None:
+        return {
+            "status": "failed",
+            "message": f"Could not decode a PNG or JPEG image within {max_dimension} pixels per side."
+        }
 
     result = properOrientedOutput(image)
 
     return result
-
-    
\ No newline at end of file
@@ -0,0 +1,225 @@
+import collections
+import struct
+import threading
+import time
+
+import numpy as np
+
+from .visualprocessing import decodeImage, orientedBarcodes, extractCommands
+from .visualcompiler import Card, cards_from_barcodes, compile_cards
+from . import metrics
+
+FRAME_HEADER = struct.Struct(">I")
+# Frames are read in pieces so the reader notices a stop request quickly.
+READ_CHUNK_BYTES = 64 * 1024
+# How long a scan waits for a read in progress once it has its answer.
+READER_JOIN_SECONDS = 1
+
+
+class LatestFrame:
+    """
+    Single slot holding the most recent undecoded frame.
+    Frames that arrive while the decoder is busy replace the one waiting,
+    so the decoder always works on the freshest image.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.received += 1
+            self._cond.notify()
+
+    @property
+    def closed(self):
+        with self._cond:
+            return self._closed and self._frame is None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next frame.  Returns None once the stream is exhausted,
+        or if no frame arrives within `timeout` seconds.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._frame is not None or self._closed, timeout
+            )
+            frame = self._frame
+            self._frame = None
+            return frame
+
+
+class FrameFuser:
+    """
+    Fuse barcode detections from several frames.
+    Each detection is placed in a grid cell measured in card sizes from the
+    `start` card, and each cell keeps a vote per barcode text.
+    """
+
+    def __init__(self, stable_frames=3, min_support=0.5):
+        self.stable_frames = stable_frames
+        self.min_support = min_support
+        self.frames = 0
+        self.votes = collections.defaultdict(collections.Counter)
+        self.recent = collections.deque(maxlen=stable_frames)
+
+    def add(self, barcodes):
+        """
+        Add the oriented barcodes of one frame and return the fused commands.
+        """
+        cards = cards_from_barcodes(barcodes)
+        anchor = cards[0]
+        for card in cards:
+            cell = (
+                round((card.y - anchor.y) / anchor.h),
+                round((card.x - anchor.x) / anchor.w),
+            )
+            self.votes[cell][card.text] += 1
+        self.frames += 1
+        commands = self.commands()
+        self.recent.append(tuple(commands))
+        return commands
+
+    def cards(self):
+        """
+        Return the winning card of every supported cell, in grid units.
+        """
+        cards = []
+        for cell in sorted(self.votes):
+            counter = self.votes[cell]
+            if sum(counter.values()) < self.frames * self.min_support:
+                continue
+            code, _ = counter.most_common(1)[0]
+            row, col = cell
+            cards.append(Card(code, col, row, 1, 1))
+        return cards
+
+    def commands(self):
+        return extractCommands([card.text for card in self.cards()])
+
+    def is_stable(self):
+        recent = self.recent
+        if len(recent) < self.stable_frames or len(recent[-1]) == 0:
+            return False
+        return all(commands == recent[-1] for commands in recent)
+
+
+def read_frames(stream, slot, max_frame_bytes, max_frames=None, stop=None):
+    """
+    Read length-prefixed JPEG frames from `stream` into `slot` until EOF,
+    `max_frames` frames, or until `stop` is set.
+    Each frame is a 4-byte big-endian length followed by the image bytes.
+    """
+    try:
+        while max_frames is None or slot.received < max_frames:
+            header = _read_exactly(stream, FRAME_HEADER.size, stop)
+            if header is None:
+                break
+            (length,) = FRAME_HEADER.unpack(header)
+            if length > max_frame_bytes:
+                break
+            frame = _read_exactly(stream, length, stop)
+            if frame is None:
+                break
+            slot.put(frame)
+    finally:
+        slot.close()
+
+
+def _read_exactly(stream, n, stop=None):
+    chunks = []
+    remaining = n
+    while remaining > 0:
+        if stop is not None and stop.is_set():
+            return None
+        chunk = stream.read(min(remaining, READ_CHUNK_BYTES))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def scan_stream(
+    stream,
+    stable_frames=3,
+    max_frame_bytes=2 * 1024 * 1024,
+    max_dimension=4096,
+    max_frames=300,
+    max_seconds=60,
+):
+    """
+    Decode frames from `stream` until the fused command sequence has been
+    the same for `stable_frames` consecutive frames.  Gives up after
+    `max_frames` frames or `max_seconds` seconds.  The reader stops with
+    the scan; a read the client never finishes is left behind after
+    `READER_JOIN_SECONDS` and the reader exits when it returns.
+    """
+    slot = LatestFrame()
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=read_frames,
+        args=(stream, slot, max_frame_bytes, max_frames, stop),
+        daemon=True,
+    )
+    reader.start()
+    try:
+        return _scan_frames(slot, stable_frames, max_dimension, max_seconds)
+    finally:
+        # Stop reading before the request's input goes away, but don't
+        # wait on a client that has stalled in the middle of a frame.
+        stop.set()
+        reader.join(timeout=READER_JOIN_SECONDS)
+
+
+def _scan_frames(slot, stable_frames, max_dimension, max_seconds):
+    deadline = time.monotonic() + max_seconds
+    fuser = FrameFuser(stable_frames=stable_frames)
+    decoded = 0
+    message = "Stream ended before the program was read consistently."
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            message = "Couldn't read the program within {:g} seconds.".format(max_seconds)
+            break
+        frame = slot.get(timeout=remaining)
+        if frame is None:
+            if slot.closed:
+                break
+            continue
+        with metrics.IMAGE_DECODE_SECONDS.time():
+            image = decodeImage(np.frombuffer(frame, np.uint8), max_dimension)
+        if image is None:
+            continue
+        decoded += 1
+        barcodes = orientedBarcodes(image)
+        if barcodes is None:
+            continue
+        commands = fuser.add(barcodes)
+        if fuser.is_stable():
+            return {
+                "status": "success",
+                "commands": commands,
+                "program": compile_cards(fuser.cards()),
+                "frames": decoded,
+                "dropped": slot.dropped,
+            }
+    return {
+        "status": "failed",
+        "message": message + " \nPlease hold the camera steady and try again.",
+        "frames": decoded,
+        "dropped": slot.dropped,
+    }